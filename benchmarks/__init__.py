@@ -0,0 +1,15 @@
+# benchmarks
+"""Synthetic catalog generator and timing benchmarks
+
+    python -m benchmarks.generate --books 1000000
+    python -m benchmarks.run --books 1000000
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# The application modules use flat imports from src/
+sys.path.insert(0, str(ROOT / "src"))
+
+DATA_DIR = ROOT / "benchmarks" / "data"
+RESULTS_DIR = ROOT / "benchmarks" / "results"
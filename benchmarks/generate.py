@@ -0,0 +1,176 @@
+# generate.py
+"""Seeded generator of realistic BUKU/RAK/KATEGORI/LOG_AKTIVITAS data
+
+Books are spread evenly over every (category, year) pair. Within a pair
+they get consecutive ID_Buku numbers (year, two-digit category, sequence,
+as in the real catalog) and consecutive, non-overlapping control number
+ranges. The base tables are filled first and the derived schema (range
+index, counters, full-text indexes) is built once afterwards by the
+normal migrations, which is much faster than firing triggers per row.
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks import DATA_DIR
+from schema import create_base_tables, migrate
+
+KATEGORI = [
+    (1, "Kelahiran"), (2, "Perkawinan"), (3, "Cerai"),
+    (4, "Kematian"), (5, "Pengangkatan Anak"), (6, "Pengesahan Anak"),
+]
+SUBKATEGORI = {
+    1: ["Berkas Permohonan Kutipan Akta Kelahiran Rutin",
+        "Berkas Permohonan Kutipan Akta Kelahiran Terlambat", "Kelahiran"],
+    2: ["Perkawinan", "Perkawinan Cina", "Perkawinan Campuran", "Perkawinan IN"],
+    3: ["Cerai", "Cerai Campuran"],
+    4: ["Kematian", "Kematian Terlambat"],
+    5: ["Pengangkatan Anak"],
+    6: ["Pengesahan Anak"],
+}
+WARNA = ["Biru Tua", "Merah", "Oranye", "Biru", "Biru Muda", "Hijau Tua"]
+SISI = [(1, "Selatan"), (2, "Tengah"), (3, "Timur"), (4, "Utara")]
+YEARS = range(1900, 2025)
+# Roughly the mix of a working archive: most books shelved
+STATUS_WEIGHTS = [("Di Rak", 90), ("Di Lantai", 7), ("Dipinjam", 3)]
+BATCH = 50000
+
+
+def catalog_path(books, seed):
+    return DATA_DIR / f"catalog-{books}-{seed}.sqlite"
+
+
+def rak_ids(count):
+    """count rak IDs like the real 10101: side digit, row and column"""
+    ids = []
+    for side, _ in SISI:
+        for row in range(1, 100):
+            for column in range(1, 100):
+                ids.append(f"{side}{row:02}{column:02}")
+    return ids[:count]
+
+
+def buckets(books):
+    """(kategori, year, count) for every pair, counts summing to books"""
+    pairs = [(kategori, year) for kategori, _ in KATEGORI for year in YEARS]
+    per, extra = divmod(books, len(pairs))
+    return [(kategori, year, per + (i < extra)) for i, (kategori, year) in enumerate(pairs)]
+
+
+def book_id(year, kategori, seq, width):
+    return f"{year}{kategori:02}{seq:0{width}}"
+
+
+def book_rows(rng, books, raks):
+    layout = buckets(books)
+    width = max(4, len(str(max(count for _, _, count in layout))))
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    for kategori, year, count in layout:
+        nomor = 1
+        for seq in range(1, count + 1):
+            size = rng.randint(10, 90)
+            yield (
+                book_id(year, kategori, seq, width), rng.choice(raks), kategori, year,
+                nomor, nomor + size - 1, rng.choice(WARNA),
+                rng.choice(SUBKATEGORI[kategori]),
+                "Baik" if rng.random() < 0.97 else "Rusak",
+                rng.choices(statuses, weights)[0],
+            )
+            nomor += size
+
+
+def log_rows(rng, logs, books, days=3 * 365):
+    """Pinjam/Kembalikan pairs on random books over the last `days` days"""
+    layout = [bucket for bucket in buckets(books) if bucket[2]]
+    width = max(4, len(str(max(count for _, _, count in layout))))
+    start = datetime.now() - timedelta(days=days)
+    step = days * 86400 / max(logs, 1)
+    for i in range(logs):
+        kategori, year, count = rng.choice(layout)
+        pinjam = i % 2 == 0
+        yield (
+            rng.randint(1, 2), book_id(year, kategori, rng.randint(1, count), width),
+            (start + timedelta(seconds=i * step)).strftime("%Y-%m-%d %H:%M:%S"),
+            "Pinjam" if pinjam else "Kembalikan",
+            "Status diubah ke " + ("Dipinjam" if pinjam else "Di Rak"),
+            "Di Rak" if pinjam else "Dipinjam", "Dipinjam" if pinjam else "Di Rak",
+        )
+
+
+def insert_batches(conn, query, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            conn.executemany(query, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(query, batch)
+
+
+def generate(path, books, logs=None, seed=1):
+    """Write a catalog of `books` books and `logs` log rows (default: as many as books)"""
+    logs = books if logs is None else logs
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(path), isolation_level=None)
+    try:
+        # Throwaway file: no journal, no fsync while loading
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        create_base_tables(conn)
+        raks = rak_ids(max(200, min(books // 1000, len(SISI) * 99 * 99)))
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO KATEGORI VALUES (?, ?)", KATEGORI)
+        conn.executemany("INSERT INTO RAK VALUES (?, ?, ?)", [
+            (rak, f"{dict(SISI)[int(rak[0])]} {rak[1:3]} {rak[3:]}",
+             "Kiri - Kanan" if int(rak[3:]) % 2 else "Kanan - Kiri")
+            for rak in raks
+        ])
+        conn.executemany("INSERT INTO PENGGUNA VALUES (?, ?, ?, ?)", [
+            (1, "Admin Ruang Arsip", "Admin", "Admin"),
+            (2, "Staff Magang Ruang Arsip", None, "Staff"),
+        ])
+        insert_batches(conn, "INSERT INTO BUKU VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       book_rows(rng, books, raks))
+        insert_batches(conn, """
+            INSERT INTO LOG_AKTIVITAS (ID_Pengguna, ID_Buku, Waktu, Jenis_Aksi,
+                                       Detail_Perubahan, Status_Sebelum, Status_Sesudah)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, log_rows(rng, logs, books))
+        conn.execute("COMMIT")
+        migrate(conn)
+    finally:
+        conn.close()
+    return path
+
+
+def ensure_catalog(books, seed=1):
+    """Path of a generated catalog, generating it on first use"""
+    path = catalog_path(books, seed)
+    if not path.exists():
+        generate(path, books, seed=seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--logs", type=int, default=None,
+                        help="LOG_AKTIVITAS rows (default: as many as books)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    path = args.output or catalog_path(args.books, args.seed)
+    started = time.perf_counter()
+    generate(Path(path), args.books, args.logs, args.seed)
+    print(f"{path}: {args.books} books in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
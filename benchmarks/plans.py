@@ -0,0 +1,209 @@
+# plans.py
+"""Query plan regression check for every DatabaseHandler query
+
+Runs each query method against a generated catalog with the slow-query
+threshold at zero, so every statement it issues is captured together
+with its EXPLAIN QUERY PLAN (see query_stats.py). A plan fails the check
+when it scans BUKU or LOG_AKTIVITAS, sorts through a temporary B-tree,
+or does not use the indexes the case expects. Exits non-zero on any
+failure, so it can run in the build:
+
+    python -m benchmarks.plans --books 100000
+"""
+import argparse
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.generate import ensure_catalog
+
+# Tables that must never be read by a full scan
+LARGE_TABLES = {"BUKU", "LOG_AKTIVITAS"}
+TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT|RIGHT PART OF ORDER BY)")
+SCAN = re.compile(r"^SCAN (\w+)(?! VIRTUAL TABLE)")
+USES = re.compile(r"^(?:SCAN|SEARCH) (\w+)(?:.*?USING (?:COVERING )?INDEX (\w+))?")
+TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+SQL_WORDS = {"WHERE", "JOIN", "LEFT", "INNER", "ON", "ORDER", "GROUP", "LIMIT", "USING", "SET"}
+
+
+class Case:
+    """One query method call and what its plans must look like
+
+    expect: index or (virtual) table names the plans must read through.
+    allow_sort: temp B-tree steps that are fine here, e.g. sorting a
+    handful of matches or grouping the small counter tables.
+    allow_scan: indexes a large table may be scanned through in order,
+    where a LIMIT stops the scan after one page.
+    """
+
+    def __init__(self, name, call, expect=(), allow_sort=(), allow_scan=()):
+        self.name = name
+        self.call = call
+        self.expect = expect
+        self.allow_sort = allow_sort
+        self.allow_scan = allow_scan
+
+
+def cases(sample):
+    book_id, nomor, kategori, tahun, low, high = sample
+    return [
+        Case("get_books_by_location", lambda db: db.get_books_by_location("Di Lantai"),
+             expect=["idx_buku_status"]),
+        Case("get_books_by_location[full]",
+             lambda db: db.get_books_by_location("Di Lantai", full_attributes=True),
+             expect=["idx_buku_status"]),
+        Case("get_book_rows_by_location", lambda db: db.get_book_rows_by_location("Dipinjam"),
+             expect=["idx_buku_status"]),
+        Case("get_book_row", lambda db: db.get_book_row(book_id),
+             expect=["sqlite_autoindex_BUKU_1"]),
+        Case("get_book_rows", lambda db: db.get_book_rows([book_id]),
+             expect=["sqlite_autoindex_BUKU_1"]),
+        Case("get_rak_book_ids", lambda db: db.get_rak_book_ids(book_id, "Di Rak"),
+             expect=["idx_buku_rak_status"]),
+        Case("search_book", lambda db: db.search_book(nomor),
+             expect=["BUKU_RENTANG"], allow_sort=["ORDER BY"]),
+        Case("search_book_matches", lambda db: db.search_book_matches(nomor),
+             expect=["BUKU_RENTANG"], allow_sort=["ORDER BY"]),
+        Case("search_book_matches[filtered]",
+             lambda db: db.search_book_matches(nomor, kategori, tahun),
+             expect=["idx_buku_kategori_tahun_rentang"]),
+        Case("search_books", lambda db: db.search_books([nomor, nomor + 1], kategori),
+             expect=["BUKU_RENTANG"], allow_sort=["ORDER BY"]),
+        Case("search_books_text", lambda db: db.search_books_text("perkawinan cina"),
+             expect=["BUKU_FTS", "LOG_FTS"], allow_sort=["ORDER BY", "GROUP BY"]),
+        Case("get_search_options", lambda db: db.get_search_options(),
+             allow_sort=["DISTINCT", "ORDER BY"]),
+        Case("get_overlapping_books", lambda db: db.get_overlapping_books(low, high, kategori, tahun),
+             expect=["BUKU_RENTANG"], allow_sort=["ORDER BY"]),
+        Case("get_stats", lambda db: db.get_stats(),
+             allow_sort=["GROUP BY", "ORDER BY"]),
+        Case("get_log_page", lambda db: db.get_log_page({}),
+             expect=["idx_log_waktu"], allow_scan=["idx_log_waktu"]),
+        Case("get_log_page[book]", lambda db: db.get_log_page({"book_id": book_id}),
+             expect=["idx_log_buku"]),
+        Case("get_log_page[user]", lambda db: db.get_log_page({"user_id": 1}),
+             expect=["idx_log_pengguna"]),
+        Case("get_log_page[action]", lambda db: db.get_log_page({"action": "Pinjam"}),
+             expect=["idx_log_aksi"]),
+        Case("get_log_page[text]", lambda db: db.get_log_page({"text": "dipinjam"}),
+             expect=["LOG_FTS"], allow_sort=["ORDER BY"]),
+        Case("get_log_summary", lambda db: db.get_log_summary(),
+             expect=["LOG_RINGKASAN"], allow_sort=["RIGHT PART OF ORDER BY"]),
+        Case("get_users", lambda db: db.get_users(),
+             allow_sort=["ORDER BY"]),
+        Case("authenticate_user", lambda db: db.authenticate_user("Admin Ruang Arsip", "Admin"),
+             expect=["sqlite_autoindex_PENGGUNA_1"]),
+        Case("transition_book", lambda db: db.transition_book(book_id, "Dipinjam", 1, "Pinjam"),
+             expect=["sqlite_autoindex_BUKU_1"]),
+        Case("transition_books",
+             lambda db: db.transition_books([book_id], "Di Rak", 1, "Kembalikan"),
+             expect=["sqlite_autoindex_BUKU_1"]),
+        Case("update_location_status", lambda db: db.update_location_status(book_id, "Di Rak"),
+             expect=["sqlite_autoindex_BUKU_1"]),
+        Case("log_activity", lambda db: db.log_activity(1, book_id, "Pinjam", "cek rencana")),
+    ]
+
+
+def pick_sample(db):
+    """A book in the middle of the catalog, its range and a number inside it"""
+    row = db.execute_query("""
+    SELECT ID_Buku, ID_Kategori, Tahun_Cetak, No_Kendali_Min, No_Kendali_Max
+    FROM BUKU WHERE rowid = (SELECT max(rowid) / 2 FROM BUKU)
+    """, fetch_one=True)
+    nomor = (row["No_Kendali_Min"] + row["No_Kendali_Max"]) // 2
+    return (row["ID_Buku"], nomor, row["ID_Kategori"], row["Tahun_Cetak"],
+            row["No_Kendali_Min"], row["No_Kendali_Max"])
+
+
+def table_aliases(sql):
+    """Map every table name and alias in a statement to its table"""
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        aliases[table.upper()] = table.upper()
+        if alias and alias.upper() not in SQL_WORDS:
+            aliases[alias.upper()] = table.upper()
+    return aliases
+
+
+def problems(case, statements):
+    """Reasons the captured statements of one case fail the check"""
+    found = []
+    used = set()
+    for statement in statements:
+        aliases = table_aliases(statement["sql"])
+        for line in statement["plan"]:
+            match = USES.match(line)
+            if match:
+                table, index = match.groups()
+                used.add(aliases.get(table.upper(), table.upper()))
+                used.add((index or "").upper())
+            scan = SCAN.match(line)
+            # Scanning a large table is O(n) even through a covering index
+            if scan and aliases.get(scan.group(1).upper(), scan.group(1).upper()) in LARGE_TABLES:
+                if not (match and match.group(2) in case.allow_scan):
+                    found.append(f"full scan: {line}")
+            sort = TEMP_BTREE.search(line)
+            if sort and sort.group(1) not in case.allow_sort:
+                found.append(f"temp B-tree: {line}")
+    for name in case.expect:
+        if name.upper() not in used:
+            found.append(f"{name} not used")
+    if not statements:
+        found.append("no statements captured")
+    return found
+
+
+def check(db, verbose=False):
+    """Run every case; returns {case name: [problems]} for the failing ones"""
+    from query_stats import QueryStats
+
+    failures = {}
+    for case in cases(pick_sample(db)):
+        # A fresh recorder with a zero threshold captures every statement
+        db.stats = QueryStats(slow_ms=0, max_slow=1000)
+        db.cache.clear()
+        case.call(db)
+        statements = list(reversed(db.stats.slow_queries()))
+        found = problems(case, statements)
+        status = "GAGAL" if found else "ok"
+        print(f"{case.name:36} {status}")
+        if verbose or found:
+            for statement in statements:
+                print(f"    {statement['sql'][:100]}")
+                for line in statement["plan"]:
+                    print(f"        {line}")
+        for reason in found:
+            print(f"    -> {reason}")
+        if found:
+            failures[case.name] = found
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    from connection import close_all
+    from database import DatabaseHandler
+
+    source = ensure_catalog(args.books, args.seed)
+    with tempfile.TemporaryDirectory() as scratch:
+        path = Path(scratch) / source.name
+        shutil.copyfile(source, path)
+        try:
+            failures = check(DatabaseHandler(path), args.verbose)
+        finally:
+            close_all()
+    if failures:
+        print(f"{len(failures)} query plan regressions")
+        sys.exit(1)
+    print("All query plans use their indexes")
+
+
+if __name__ == "__main__":
+    main()
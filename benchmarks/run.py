@@ -0,0 +1,245 @@
+# run.py
+"""Repeatable timing benchmarks over a generated catalog
+
+Every benchmark runs a fixed number of times against the catalog of the
+requested size (generated on first use, see generate.py) and reports
+min/median/p95/mean in milliseconds. The query cache is cleared before
+each timed call so the numbers are the database's, not the cache's.
+Results are written as JSON; --baseline compares against an earlier
+results file and exits non-zero when a benchmark got slower than the
+allowed ratio.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks import RESULTS_DIR, ROOT
+from benchmarks.generate import ensure_catalog
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": samples[0] * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+    }
+
+
+def timed(fn, runs, setup=None):
+    """Time fn() runs times; setup() runs untimed before each call"""
+    samples = []
+    for i in range(runs):
+        argument = setup(i) if setup is not None else None
+        started = time.perf_counter()
+        fn(argument)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def sample_numbers(db, count, rng):
+    """Control numbers inside existing ranges, with their category and year"""
+    top = db.execute_query("SELECT max(rowid) AS top FROM BUKU", fetch_one=True)["top"]
+    rowids = [rng.randint(1, top) for _ in range(count)]
+    rows = db.fetch_rows(
+        "SELECT No_Kendali_Min, No_Kendali_Max, ID_Kategori, Tahun_Cetak FROM BUKU "
+        "WHERE rowid IN (SELECT value FROM json_each(?))", (json.dumps(rowids),)
+    )
+    return [(rng.randint(low, high), kategori, tahun) for low, high, kategori, tahun in rows]
+
+
+def book_ids(db, count, rng, status="Di Rak"):
+    rows = db.fetch_rows(
+        "SELECT ID_Buku FROM BUKU WHERE Status_Lokasi = ? LIMIT ?", (status, count * 20)
+    )
+    return rng.sample([row[0] for row in rows], min(count, len(rows)))
+
+
+def bench_queries(db, runs, rng):
+    results = {}
+    numbers = sample_numbers(db, runs, rng)
+    clear = db.cache.clear
+
+    def by_number(i):
+        clear()
+        return numbers[i % len(numbers)]
+
+    results["search_book"] = timed(lambda n: db.search_book(n[0]), runs, by_number)
+    results["search_book_matches_filtered"] = timed(
+        lambda n: db.search_book_matches(*n), runs, by_number
+    )
+    results["search_books_text"] = timed(
+        lambda _: db.search_books_text("perkawinan cina"), runs, lambda i: clear()
+    )
+    for status in ("Di Lantai", "Dipinjam"):
+        key = status.lower().replace(" ", "_")
+        results[f"get_books_by_location[{key}]"] = timed(
+            lambda _: db.get_books_by_location(status), max(runs // 10, 3), lambda i: clear()
+        )
+        results[f"get_book_rows_by_location[{key}]"] = timed(
+            lambda _: db.get_book_rows_by_location(status), max(runs // 10, 3), lambda i: clear()
+        )
+    results["get_stats"] = timed(lambda _: db.get_stats(), runs, lambda i: clear())
+    results["get_log_page"] = timed(lambda _: db.get_log_page({}, None, 200), runs, lambda i: clear())
+    return results
+
+
+def bench_writes(db, runs, rng):
+    results = {}
+    ids = book_ids(db, runs, rng)
+
+    # Even calls lend a book out, odd calls bring it back
+    def flip(i):
+        return ("Dipinjam", "Pinjam") if i % 2 == 0 else ("Di Rak", "Kembalikan")
+
+    results["transition_book"] = timed(
+        lambda i: db.transition_book(ids[i // 2 % len(ids)], flip(i)[0], 1, flip(i)[1]),
+        runs * 2, lambda i: i
+    )
+    batch = ids[:100]
+    results["transition_books[100]"] = timed(
+        lambda i: db.transition_books(batch, flip(i)[0], 1, flip(i)[1]),
+        max(runs // 5, 4), lambda i: i
+    )
+    stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [(1, book_id, "Pinjam", "Status diubah ke Dipinjam", stamp, "Di Rak", "Dipinjam")
+            for book_id in (ids * 100)[:100]]
+    results["log_activity"] = timed(
+        lambda _: db.log_activity(1, ids[0], "Pinjam", "benchmark"), runs
+    )
+    results["write_log_rows[100]"] = timed(lambda _: db.write_log_rows(rows), runs)
+    return results
+
+
+def bench_table(db, runs):
+    """Offscreen Qt: build the location table model and size its columns"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication, QTableView
+    from table_model import BookTableModel, size_columns
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    rows = db.get_book_rows_by_location("Di Lantai") or []
+    books = db.get_books_by_location("Di Lantai") or []
+    view = QTableView()
+
+    def populate_rows(_):
+        view.setModel(BookTableModel(rows, view))
+        size_columns(view)
+        app.processEvents()
+
+    def populate_books(_):
+        view.setModel(BookTableModel.from_books(books, view))
+        size_columns(view)
+        app.processEvents()
+
+    runs = max(runs // 10, 3)
+    return {
+        "populate_table[rows]": dict(timed(populate_rows, runs), rows=len(rows)),
+        "populate_table[books]": dict(timed(populate_books, runs), rows=len(books)),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(books, seed=1, runs=50, qt=True):
+    """Run every benchmark on a scratch copy of the catalog"""
+    from connection import close_all
+    from database import DatabaseHandler
+
+    source = ensure_catalog(books, seed)
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as scratch:
+        # Writes go to a copy so the generated catalog stays reusable
+        path = Path(scratch) / source.name
+        shutil.copyfile(source, path)
+        db = DatabaseHandler(path)
+        try:
+            results = bench_queries(db, runs, rng)
+            results.update(bench_writes(db, runs, rng))
+            if qt:
+                results.update(bench_table(db, runs))
+        finally:
+            close_all()
+    return {
+        "meta": {
+            "books": books,
+            "seed": seed,
+            "runs": runs,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, max_ratio):
+    """Print median changes against a baseline; returns the regressed names"""
+    regressed = []
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name)
+        if not result or not before:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else 1.0
+        flag = "  REGRESI" if ratio > max_ratio else ""
+        print(f"{name:40} {before['median_ms']:10.3f} -> {result['median_ms']:10.3f} ms"
+              f"  x{ratio:.2f}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--no-qt", action="store_true", help="skip the offscreen table benchmarks")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None, help="earlier results JSON to compare with")
+    parser.add_argument("--max-ratio", type=float, default=1.5,
+                        help="median slowdown against the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    report = run(args.books, args.seed, args.runs, qt=not args.no_qt)
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"bench-{args.books}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    for name, result in report["results"].items():
+        if result:
+            print(f"{name:40} median {result['median_ms']:10.3f} ms  p95 {result['p95_ms']:10.3f} ms")
+    print(f"Results: {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if compare(report, baseline, args.max_ratio):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
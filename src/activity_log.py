@@ -0,0 +1,132 @@
+# activity_log.py
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+_STOP = object()
+
+
+class ActivityLogWriter:
+    """Background writer that stores audit rows in batches
+
+    Rows are queued by log() and written by one thread, a batch per
+    transaction, once max_batch rows are waiting or interval_ms has passed
+    since the first queued row. The queue is bounded: when it is full,
+    log() blocks until the writer has caught up. close() writes everything
+    still queued before returning; rows logged after that are written
+    synchronously. A batch that fails to write is retried, then written
+    row by row so one bad row does not lose the others.
+    """
+
+    RETRIES = 3
+
+    def __init__(self, db, max_batch=100, interval_ms=500, max_queue=10000):
+        self.db = db
+        self.max_batch = max_batch
+        self.interval = interval_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="ActivityLogWriter", daemon=True)
+        self._closed = False
+        self._closing = threading.Lock()
+        self._thread.start()
+
+    def log(self, user_id, book_id, action_type, details, status_before=None, status_after=None):
+        """Queue one LOG_AKTIVITAS row, stamped now"""
+        self._put((user_id, book_id, action_type, details, time.time(), status_before, status_after))
+
+    def log_many(self, rows):
+        """Queue (user_id, book_id, action_type, details, before, after) rows sharing one timestamp"""
+        stamp = time.time()
+        for user_id, book_id, action_type, details, before, after in rows:
+            self._put((user_id, book_id, action_type, details, stamp, before, after))
+
+    def _put(self, entry):
+        with self._closing:
+            if not self._closed:
+                self._queue.put(entry)
+                return
+        self._write([entry])
+
+    def flush(self):
+        """Block until every queued row has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write the remaining rows and stop the writer thread"""
+        with self._closing:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                self._queue.task_done()
+                return
+            batch = [entry]
+            stop = False
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        # Timestamps are formatted here, off the thread that logged them
+        rows = [
+            (user_id, book_id, action_type, details,
+             datetime.fromtimestamp(stamp).strftime("%Y-%m-%d %H:%M:%S"), before, after)
+            for user_id, book_id, action_type, details, stamp, before, after in batch
+        ]
+        for attempt in range(self.RETRIES):
+            if self.db.write_log_rows(rows) is not None:
+                return
+            time.sleep(0.1 * 2 ** attempt)
+        failed = [row for row in rows if self.db.write_log_rows([row]) is None]
+        if failed:
+            print(f"Activity log error: {len(failed)} rows not written")
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def start_log_writer(db, **options):
+    """Start the process-wide log writer for a database, if not running yet"""
+    with _writers_lock:
+        writer = _writers.get(db.pool)
+        if writer is None:
+            writer = ActivityLogWriter(db, **options)
+            _writers[db.pool] = writer
+        return writer
+
+
+def log_writer_for(pool):
+    """Return the running log writer of a pool, or None to log synchronously"""
+    return _writers.get(pool)
+
+
+def stop_log_writers():
+    """Flush and stop every log writer, e.g. on QApplication.aboutToQuit"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
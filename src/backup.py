@@ -0,0 +1,145 @@
+# backup.py
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from exporter import export_snapshot
+from schema import ensure_schema
+
+
+DEFAULT_BACKUP_DIR = Path(__file__).resolve().parent.parent / "data" / "backup"
+SNAPSHOT_PATTERN = "arsip-*.sqlite"
+
+
+def verify_snapshot(path):
+    """Run PRAGMA quick_check on a snapshot file, returning True when it is intact"""
+    try:
+        conn = sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("PRAGMA quick_check").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Backup check error: {e}")
+        return False
+    return rows == [("ok",)]
+
+
+class BackupManager:
+    """Online snapshots of the live database with rotation and restore
+
+    Snapshots are taken with the SQLite backup API in steps of `pages`
+    pages, pausing between steps so readers and the writer keep going.
+    Every snapshot is checked with PRAGMA quick_check before it counts,
+    and only the newest `keep` snapshots are retained. Each snapshot is a
+    full copy of the database; the schedule only skips the copy when
+    nothing was written since the last one.
+    """
+
+    def __init__(self, db, backup_dir=None, keep=14, pages=256, pause=0.005):
+        self.db = db
+        self.backup_dir = Path(backup_dir or DEFAULT_BACKUP_DIR)
+        self.keep = keep
+        self.pages = pages
+        self.pause = pause
+        self._lock = threading.Lock()
+        self._timer = None
+        self._last_version = None
+
+    def list_snapshots(self):
+        """Snapshots in the backup folder, newest first"""
+        return sorted(self.backup_dir.glob(SNAPSHOT_PATTERN), reverse=True)
+
+    def create_snapshot(self, label="", progress=None):
+        """Take, verify and register one snapshot; returns its path"""
+        with self._lock:
+            # Milliseconds keep snapshots of the same second apart
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+            suffix = f"-{label}" if label else ""
+            path = self.backup_dir / f"arsip-{stamp}{suffix}.sqlite"
+            counter = 1
+            while path.exists():
+                path = self.backup_dir / f"arsip-{stamp}-{counter}{suffix}.sqlite"
+                counter += 1
+            version = self._data_version()
+            export_snapshot(self.db, path, pages=self.pages, pause=self.pause,
+                            progress=progress)
+            if not verify_snapshot(path):
+                path.unlink(missing_ok=True)
+                raise sqlite3.DatabaseError("Snapshot gagal diverifikasi (quick_check)")
+            self._last_version = version
+            self.rotate()
+            return path
+
+    def rotate(self):
+        """Delete snapshots beyond the retention limit"""
+        for old in self.list_snapshots()[self.keep:]:
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{old}{suffix}").unlink(missing_ok=True)
+
+    def _data_version(self):
+        """Changes through this process's writer plus commits by other processes"""
+        return self.db.pool.total_changes(), self.db.pool.data_version()
+
+    def snapshot_if_changed(self):
+        """Take a snapshot only when something was written since the last one"""
+        if self._last_version == self._data_version():
+            return None
+        return self.create_snapshot()
+
+    def restore(self, snapshot_path, progress=None):
+        """Replace the live database with a verified snapshot
+
+        A safety snapshot of the current state is taken first. The copy
+        runs over the pool's write connection, so no other write can
+        interleave with it.
+        """
+        snapshot_path = Path(snapshot_path)
+        if not verify_snapshot(snapshot_path):
+            raise sqlite3.DatabaseError(f"Snapshot rusak: {snapshot_path}")
+        self.create_snapshot(label="sebelum-restore")
+
+        def on_step(status, remaining, total):
+            if progress is not None:
+                progress(total - remaining, total)
+
+        source = sqlite3.connect(f"file:{snapshot_path.as_posix()}?mode=ro", uri=True)
+        try:
+            with self.db.pool.exclusive() as conn:
+                source.backup(conn, pages=self.pages, progress=on_step)
+                ensure_schema(conn)
+        finally:
+            source.close()
+        self.db.invalidate_cache()
+        return snapshot_path
+
+    def start_schedule(self, interval_seconds):
+        """Take a snapshot every interval on a background timer when data changed"""
+        def tick():
+            try:
+                self.snapshot_if_changed()
+            except sqlite3.Error as e:
+                print(f"Scheduled backup error: {e}")
+            with self._lock:
+                if self._timer is not None:
+                    self._schedule(interval_seconds, tick)
+
+        with self._lock:
+            self._schedule(interval_seconds, tick)
+
+    def _schedule(self, interval_seconds, tick):
+        self._timer = threading.Timer(interval_seconds, tick)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop_schedule(self):
+        """Stop the timer and wait for a snapshot it is taking to finish,
+        so the pool can be closed right after"""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            # Outside the lock: the running tick takes it to snapshot
+            if timer is not threading.current_thread():
+                timer.join()
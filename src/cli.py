@@ -0,0 +1,199 @@
+# cli.py
+"""Command line interface over DatabaseHandler, without Qt
+
+    python src/cli.py search 1234 5678
+    cat nomor.txt | python src/cli.py search --kategori 2
+    python src/cli.py status Dipinjam 2002020001 2002020002
+    python src/cli.py stats --json
+    python src/cli.py import buku.xlsx
+    python src/cli.py export data/ekspor --format jsonl.gz
+    python src/cli.py backup
+
+Only the standard library and the database modules are imported at
+startup; pandas is loaded by the import command alone. Results go to
+stdout; connection messages and errors go to stderr. Exit status is 0 on
+success, 1 when something was not found or not changed, 2 on errors.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from connection import close_all
+from database import DatabaseHandler
+
+STATUSES = ("Di Rak", "Di Lantai", "Dipinjam")
+RESULT_COLUMNS = ("ID_Buku", "Nama_Rak", "Nama_Kategori", "Tahun_Cetak",
+                  "No_Kendali_Min", "No_Kendali_Max", "Status_Lokasi")
+
+
+def read_words(values):
+    """The given values, or whitespace-separated words from stdin when
+    there are none or the only one is -"""
+    if not values or values == ["-"]:
+        return sys.stdin.read().split()
+    return values
+
+
+def write_table(out, rows, columns):
+    for row in rows:
+        out.write("\t".join("" if row.get(column) is None else str(row[column])
+                            for column in columns) + "\n")
+
+
+def cmd_search(db, args, out):
+    numbers = []
+    for word in read_words(args.nomor):
+        if not word.isdigit():
+            print(f"Nomor kendali tidak valid: {word}", file=sys.stderr)
+            return 2
+        numbers.append(int(word))
+    found = db.search_books(numbers, args.kategori, args.tahun)
+    if found is None:
+        return 2
+    missing = sorted(set(numbers) - set(found))
+    if args.json:
+        json.dump({"found": {str(nomor): books for nomor, books in found.items()},
+                   "missing": missing}, out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    else:
+        for nomor, books in sorted(found.items()):
+            write_table(out, [dict(book, Nomor=nomor) for book in books],
+                        ("Nomor",) + RESULT_COLUMNS)
+    for nomor in missing:
+        print(f"Nomor tidak ditemukan: {nomor}", file=sys.stderr)
+    return 1 if missing else 0
+
+
+def cmd_status(db, args, out):
+    book_ids = read_words(args.book_ids)
+    action = args.aksi or ("Kembalikan" if args.status == "Di Rak" else "Pinjam")
+    changed = db.transition_books(book_ids, args.status, args.user, action, args.detail)
+    if changed is None:
+        return 2
+    for book_id, old_status in changed:
+        out.write(f"{book_id}\t{old_status}\t{args.status}\n")
+    unchanged = len(set(book_ids)) - len(changed)
+    if unchanged:
+        print(f"{unchanged} buku tidak diubah (tidak ada atau sudah {args.status})",
+              file=sys.stderr)
+    return 0 if changed else 1
+
+
+def cmd_stats(db, args, out):
+    stats = db.get_stats()
+    if stats is None:
+        return 2
+    if args.json:
+        json.dump(stats, out, ensure_ascii=False, indent=2)
+        out.write("\n")
+        return 0
+    total = stats["total"]
+    out.write(f"Total\t{total['Total'] or 0}\tDi Rak\t{total['Di_Rak'] or 0}\t"
+              f"Di Lantai\t{total['Di_Lantai'] or 0}\tDipinjam\t{total['Dipinjam'] or 0}\n")
+    write_table(out, stats["kategori"],
+                ("Nama_Kategori", "Di_Rak", "Di_Lantai", "Dipinjam", "Total"))
+    return 0
+
+
+def cmd_import(db, args, out):
+    # pandas is only needed here
+    from importer import import_books
+
+    result = import_books(db, Path(args.file), reject_overlaps=args.reject_overlaps,
+                          update_existing=args.update, user_id=args.user)
+    out.write(f"{result.imported} dari {result.total} baris diimpor\n")
+    if result.updated:
+        out.write(f"{result.updated} buku diperbarui\n")
+    if result.rejected:
+        out.write(f"{len(result.rejected)} baris ditolak\n")
+    if result.overlaps:
+        out.write(f"{len(result.overlaps)} baris tumpang tindih\n")
+    if result.report_path:
+        out.write(f"Laporan kesalahan: {result.report_path}\n")
+    return 1 if result.rejected else 0
+
+
+def cmd_export(db, args, out):
+    from exporter import export_tables
+
+    manifest = export_tables(db, args.dir, fmt=args.format)
+    for table, state in manifest["tables"].items():
+        out.write(f"{table}\t{state['rows']}\n")
+    return 0
+
+
+def cmd_backup(db, args, out):
+    from backup import BackupManager
+
+    path = BackupManager(db, backup_dir=args.dir, keep=args.keep).create_snapshot(label=args.label)
+    out.write(f"{path}\n")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Katalog arsip tanpa antarmuka grafis")
+    parser.add_argument("--db", default=None, help="file database (bawaan: data/arsip.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="cari nomor kendali (argumen atau stdin)")
+    search.add_argument("nomor", nargs="*")
+    search.add_argument("--kategori", type=int, default=None, help="ID_Kategori")
+    search.add_argument("--tahun", type=int, default=None, help="Tahun_Cetak")
+    search.add_argument("--json", action="store_true")
+    search.set_defaults(run=cmd_search)
+
+    status = commands.add_parser("status", help="ubah status lokasi buku (argumen atau stdin)")
+    status.add_argument("status", choices=STATUSES)
+    status.add_argument("book_ids", nargs="*")
+    status.add_argument("--user", type=int, default=2, help="ID_Pengguna yang dicatat (bawaan: 2)")
+    status.add_argument("--aksi", choices=("Pinjam", "Kembalikan"), default=None,
+                        help="Jenis_Aksi (bawaan: Kembalikan ke Di Rak, selain itu Pinjam)")
+    status.add_argument("--detail", default=None)
+    status.set_defaults(run=cmd_status)
+
+    stats = commands.add_parser("stats", help="jumlah buku per status")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(run=cmd_stats)
+
+    imports = commands.add_parser("import", help="impor BUKU dari CSV atau Excel")
+    imports.add_argument("file")
+    imports.add_argument("--reject-overlaps", action="store_true")
+    imports.add_argument("--update", action="store_true",
+                         help="perbarui buku yang sudah ada (bawaan: tolak) dan catat di log")
+    imports.add_argument("--user", type=int, default=2, help="ID_Pengguna untuk log perubahan (bawaan: 2)")
+    imports.set_defaults(run=cmd_import)
+
+    export = commands.add_parser("export", help="ekspor tabel ke folder")
+    export.add_argument("dir")
+    export.add_argument("--format", choices=("csv", "jsonl.gz"), default="csv")
+    export.set_defaults(run=cmd_export)
+
+    backup = commands.add_parser("backup", help="buat snapshot database")
+    backup.add_argument("--dir", default=None, help="folder snapshot (bawaan: data/backup)")
+    backup.add_argument("--keep", type=int, default=14)
+    backup.add_argument("--label", default="")
+    backup.set_defaults(run=cmd_backup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    # Library messages ("Connected to database", errors) must not mix
+    # with results a script may parse
+    with redirect_stdout(sys.stderr):
+        try:
+            db = DatabaseHandler(args.db)
+            return args.run(db, args, out)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return 2
+        finally:
+            close_all()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# connection.py
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from schema import ensure_schema
+
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "arsip.sqlite"
+
+# Applied to every connection the pool opens
+CONNECTION_PRAGMAS = (
+    "PRAGMA cache_size = -16000",       # 16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",     # map up to 256 MB of the file
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+class ConnectionPool:
+    """Bounded pool of read connections plus a single write connection"""
+
+    def __init__(self, db_path, max_readers=4):
+        self.db_path = Path(db_path)
+        self.max_readers = max_readers
+
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        # FULL syncs the WAL on every commit, so a committed loan or return
+        # survives a power loss; NORMAL would save that fsync but could
+        # roll back the last commits (never corrupt the file). Readers
+        # never commit, so they keep the default.
+        self._writer.execute("PRAGMA synchronous = FULL")
+        ensure_schema(self._writer)
+        self._write_lock = threading.RLock()
+        self._write_owner = None
+        self._txn_depth = 0
+        self._on_commit = []
+        self._data_version = self._writer.execute("PRAGMA data_version").fetchone()[0]
+
+        self._readers = queue.LifoQueue()
+        self._all_readers = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+        print(f"Connected to database: {self.db_path}")
+
+    def _connect(self, read_only=False):
+        conn = sqlite3.connect(
+            str(self.db_path), isolation_level=None, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _checkout_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if len(self._all_readers) < self.max_readers:
+                conn = self._connect(read_only=True)
+                self._all_readers.append(conn)
+                return conn
+        return self._readers.get()
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read connection; inside a write transaction, reuse the writer"""
+        if self._write_owner == threading.get_ident():
+            yield self._writer
+            return
+        conn = self._checkout_reader()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Hold the write connection for one transaction, committing once
+
+        A nested call runs in a SAVEPOINT: if it raises, only its own
+        writes are rolled back, so an outer block that catches the error
+        can still commit the rest.
+        """
+        with self._write_lock:
+            depth = self._txn_depth
+            if depth == 0:
+                self._writer.execute("BEGIN IMMEDIATE")
+                self._write_owner = threading.get_ident()
+            else:
+                self._writer.execute(f"SAVEPOINT nested_{depth}")
+            self._txn_depth += 1
+            try:
+                yield self._writer
+            except BaseException:
+                self._txn_depth -= 1
+                if depth == 0:
+                    self._write_owner = None
+                    self._on_commit.clear()
+                    self._writer.execute("ROLLBACK")
+                else:
+                    self._writer.execute(f"ROLLBACK TO nested_{depth}")
+                    self._writer.execute(f"RELEASE nested_{depth}")
+                raise
+            else:
+                self._txn_depth -= 1
+                if depth == 0:
+                    self._write_owner = None
+                    self._writer.execute("COMMIT")
+                    callbacks, self._on_commit = self._on_commit, []
+                    for callback in callbacks:
+                        callback()
+                else:
+                    self._writer.execute(f"RELEASE nested_{depth}")
+
+    def on_commit(self, callback):
+        """Run callback once the current thread's write transaction commits,
+        or right away outside a transaction"""
+        if self._write_owner == threading.get_ident():
+            self._on_commit.append(callback)
+        else:
+            callback()
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the write connection outside a transaction, e.g. for a restore"""
+        with self._write_lock:
+            if self._txn_depth:
+                raise sqlite3.OperationalError("Write transaction already in progress")
+            yield self._writer
+
+    def data_version(self):
+        """PRAGMA data_version of the write connection, which changes only
+        when another connection (another process) commits
+
+        Read without waiting: while another thread holds the writer, the
+        last value read is returned; nobody else can commit while its
+        transaction is open.
+        """
+        if self._write_lock.acquire(blocking=False):
+            try:
+                self._data_version = self._writer.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error:
+                pass
+            finally:
+                self._write_lock.release()
+        return self._data_version
+
+    def total_changes(self):
+        """Rows changed through this pool's writer since it was opened"""
+        return self._writer.total_changes
+
+    def close(self):
+        """Close every connection owned by the pool"""
+        with self._readers_lock:
+            if self._closed:
+                return
+            self._closed = True
+            readers = list(self._all_readers)
+            self._all_readers.clear()
+        for conn in readers:
+            conn.close()
+        with self._write_lock:
+            try:
+                self._writer.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            self._writer.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    """Return the process-wide pool for a database file, opening it on first use"""
+    path = Path(db_path or DEFAULT_DB_PATH).resolve()
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = ConnectionPool(path)
+            _pools[path] = pool
+        return pool
+
+
+def close_all():
+    """Close every open pool, e.g. on QApplication.aboutToQuit"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
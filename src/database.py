@@ -1,39 +1,255 @@
 # database.py
+import json
+import re
 import sqlite3
-from pathlib import Path
+import time
 from datetime import datetime
 from typing import Any
 
+from activity_log import log_writer_for
+from connection import get_pool
+from log_archive import archive_dir, archive_files, archive_logs
+from query_cache import cache_for
+from query_stats import current_name, query_plan, stats_for, traced
+from schema import rebuild_range_index
+
+
+LOG_INSERT = """
+INSERT INTO LOG_AKTIVITAS
+(ID_Pengguna, ID_Buku, Jenis_Aksi, Detail_Perubahan, Waktu, Status_Sebelum, Status_Sesudah)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Column order of the book tables shown in the UI
+BOOK_COLUMNS = (
+    "ID_Buku", "Nama_Rak", "Nama_Kategori", "Tahun_Cetak",
+    "No_Kendali_Min", "No_Kendali_Max", "Warna_Sampul", "Subkategori",
+    "Status_Kondisi", "Status_Lokasi",
+)
+# Control number search, one constant statement per filter combination so
+# each connection's statement cache keeps them prepared. With both category
+# and year the composite index is used, otherwise the range index.
+SEARCH_QUERIES = {
+    (True, True): """
+    SELECT B.*, R.Nama_Rak, K.Nama_Kategori
+    FROM BUKU B
+    JOIN RAK R ON B.ID_Rak = R.ID_Rak
+    JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+    WHERE B.ID_Kategori = ?2 AND B.Tahun_Cetak = ?3
+      AND B.No_Kendali_Min <= ?1 AND B.No_Kendali_Max >= ?1
+    ORDER BY B.No_Kendali_Min, B.No_Kendali_Max
+    """,
+    (True, False): """
+    SELECT B.*, R.Nama_Rak, K.Nama_Kategori
+    FROM BUKU_RENTANG T
+    JOIN BUKU B ON B.ID_Buku = T.ID_Buku
+    JOIN RAK R ON B.ID_Rak = R.ID_Rak
+    JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+    WHERE T.No_Kendali_Min <= ?1 AND T.No_Kendali_Max >= ?1
+      AND B.ID_Kategori = ?2
+    ORDER BY B.Tahun_Cetak, B.No_Kendali_Min, B.ID_Buku
+    """,
+    (False, True): """
+    SELECT B.*, R.Nama_Rak, K.Nama_Kategori
+    FROM BUKU_RENTANG T
+    JOIN BUKU B ON B.ID_Buku = T.ID_Buku
+    JOIN RAK R ON B.ID_Rak = R.ID_Rak
+    JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+    WHERE T.No_Kendali_Min <= ?1 AND T.No_Kendali_Max >= ?1
+      AND B.Tahun_Cetak = ?3
+    ORDER BY B.ID_Kategori, B.No_Kendali_Min, B.ID_Buku
+    """,
+    (False, False): """
+    SELECT B.*, R.Nama_Rak, K.Nama_Kategori
+    FROM BUKU_RENTANG T
+    JOIN BUKU B ON B.ID_Buku = T.ID_Buku
+    JOIN RAK R ON B.ID_Rak = R.ID_Rak
+    JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+    WHERE T.No_Kendali_Min <= ?1 AND T.No_Kendali_Max >= ?1
+    ORDER BY B.ID_Kategori, B.Tahun_Cetak, B.No_Kendali_Min, B.ID_Buku
+    """,
+}
+
+# Column order of the activity log viewer
+LOG_COLUMNS = (
+    "ID_Log", "Waktu", "Username", "ID_Buku", "Jenis_Aksi",
+    "Detail_Perubahan", "Status_Sebelum", "Status_Sesudah",
+)
+LOG_PAGE_SIZE = 200
+
+
+# Target table of INSERT/REPLACE/UPDATE/DELETE statements, for cache invalidation
+WRITE_TARGET = re.compile(
+    r"\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)",
+    re.IGNORECASE
+)
+
+BOOK_TABLES = ("BUKU", "RAK", "KATEGORI")
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word, as a prefix, must match"""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
 
 class DatabaseHandler:
     def __init__(self, db_path=None):
-        if db_path is None:
-            base_dir = Path(__file__).resolve().parent.parent
-            self.db_path = base_dir / "data" / "arsip.sqlite"
-        else:
-            self.db_path = Path(db_path)
+        # Every handler for the same file shares one pooled set of
+        # connections: a single writer and a bounded set of readers.
+        self.pool = get_pool(db_path)
+        self.db_path = self.pool.db_path
+        # Read-through cache of query results, also shared per file
+        self.cache = cache_for(self.pool)
+        # Latency histograms and slow statement log, likewise shared
+        self.stats = stats_for(self.pool)
+
+    def _record_statement(self, conn, kind, query, params, started, rows):
+        """Count a statement run outside any traced method under its kind,
+        and log it with its plan when it was slow"""
+        ms = (time.perf_counter() - started) * 1000
+        name = current_name(None)
+        if name is None:
+            self.stats.record(kind, ms, rows)
+            name = kind
+        if self.stats.is_slow(ms):
+            self.stats.record_slow(name, query, ms, query_plan(conn, query, params))
+
+    def _execute(self, conn, query, params=()):
+        """conn.execute inside a transaction, timed like execute_write"""
+        started = time.perf_counter()
+        cur = conn.execute(query, params)
+        self._record_statement(conn, "execute_write", query, params, started, max(cur.rowcount, 0))
+        return cur
+
+    def query_stats(self):
+        """Latency per query, slow statements and cache counters, for diagnostics"""
+        return {
+            "since": self.stats.since().strftime("%Y-%m-%d %H:%M:%S"),
+            "slow_ms": self.stats.slow_ms,
+            "queries": self.stats.snapshot(),
+            "slow": self.stats.slow_queries(),
+            "cache": self.cache.stats(),
+        }
 
-        self.conn = sqlite3.connect(str(self.db_path))
-        self.conn.row_factory = sqlite3.Row
-        print(f"Connected to database: {self.db_path}")
+    def reset_query_stats(self):
+        self.stats.reset()
 
     def execute_query(self, query, params=(), fetch_one=False):
-        """Execute SQL query and return results as dictionaries"""
+        """Execute a read-only SQL query and return results as dictionaries"""
+        try:
+            with self.pool.reader() as conn:
+                started = time.perf_counter()
+                cur = conn.execute(query, params)
+                if fetch_one:
+                    row = cur.fetchone()
+                    self._record_statement(conn, "execute_query", query, params, started, int(bool(row)))
+                    return dict(row) if row else None
+                else:
+                    rows = cur.fetchall()
+                    self._record_statement(conn, "execute_query", query, params, started, len(rows))
+                    return [dict(row) for row in rows]
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return None
+
+    def iter_query(self, query, params=(), batch_size=256):
+        """Stream the rows of a read-only SQL query as dictionaries"""
+        try:
+            with self.pool.reader() as conn:
+                started = time.perf_counter()
+                cur = conn.execute(query, params)
+                # Only the time to the first row is ours; the rest is the consumer's
+                self._record_statement(conn, "iter_query", query, params, started, 0)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield dict(row)
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+
+    def fetch_rows(self, query, params=()):
+        """Execute a read-only SQL query and return plain tuples"""
+        try:
+            with self.pool.reader() as conn:
+                cur = conn.cursor()
+                cur.row_factory = None
+                started = time.perf_counter()
+                rows = cur.execute(query, params).fetchall()
+                self._record_statement(conn, "fetch_rows", query, params, started, len(rows))
+                return rows
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return None
+
+    def cached_query(self, query, params=(), tables=BOOK_TABLES, fetch_one=False):
+        """execute_query through the query cache; tables are the ones it reads"""
+        result = self.cache.get_or_load(
+            ("query", query, tuple(params), fetch_one), tables,
+            lambda: self.execute_query(query, params, fetch_one=fetch_one)
+        )
+        # Hand out copies so callers may modify the rows they get
+        if result is None:
+            return None
+        if fetch_one:
+            return dict(result)
+        return [dict(row) for row in result]
+
+    def cached_rows(self, query, params=(), tables=BOOK_TABLES):
+        """fetch_rows through the query cache; tables are the ones it reads"""
+        rows = self.cache.get_or_load(
+            ("rows", query, tuple(params)), tables,
+            lambda: self.fetch_rows(query, params)
+        )
+        return None if rows is None else list(rows)
+
+    def invalidate_cache(self, *tables):
+        """Drop cached results reading the given tables (all when none are
+        given), once the current write transaction has committed"""
+        if tables:
+            self.pool.on_commit(lambda: self.cache.invalidate(*tables))
+        else:
+            self.pool.on_commit(self.cache.clear)
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def transaction(self):
+        """Group write statements into a single transaction and commit"""
+        return self.pool.transaction()
+
+    def execute_write(self, query, params=()):
+        """Execute a write statement and return the number of affected rows"""
         try:
-            cur = self.conn.cursor()
-            cur.execute(query, params)
-            self.conn.commit()
-
-            if fetch_one:
-                row = cur.fetchone()
-                return dict(row) if row else None
-            else:
-                return [dict(row) for row in cur.fetchall()]
+            with self.transaction() as conn:
+                started = time.perf_counter()
+                cur = conn.execute(query, params)
+                self._record_statement(conn, "execute_write", query, params, started, cur.rowcount)
+                self.invalidate_cache(*WRITE_TARGET.findall(query))
+            return cur.rowcount
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             return None
 
-    def get_books_by_location(self, status, full_attributes=False):
+    def execute_many(self, query, seq_of_params):
+        """Execute a write statement for every parameter set in one transaction"""
+        try:
+            seq_of_params = list(seq_of_params)
+            with self.transaction() as conn:
+                started = time.perf_counter()
+                cur = conn.executemany(query, seq_of_params)
+                self._record_statement(conn, "execute_many", query,
+                                       seq_of_params[0] if seq_of_params else (), started, cur.rowcount)
+                self.invalidate_cache(*WRITE_TARGET.findall(query))
+            return cur.rowcount
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return None
+
+    @traced
+    def get_books_by_location(self, status, full_attributes=False, stream=False):
         """Get books by location status with all attributes"""
         if full_attributes:
             query = """
@@ -52,41 +268,542 @@ class DatabaseHandler:
             JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
             WHERE B.Status_Lokasi = ?
             """
-        return self.execute_query(query, (status,))
+        if stream:
+            return self.iter_query(query, (status,))
+        return self.cached_query(query, (status,))
+
+    @traced
+    def get_book_rows_by_location(self, status):
+        """Get books by location status as tuples in BOOK_COLUMNS order"""
+        query = """
+        SELECT B.ID_Buku, R.Nama_Rak, K.Nama_Kategori, B.Tahun_Cetak,
+               B.No_Kendali_Min, B.No_Kendali_Max, B.Warna_Sampul, B.Subkategori,
+               B.Status_Kondisi, B.Status_Lokasi
+        FROM BUKU B
+        JOIN RAK R ON B.ID_Rak = R.ID_Rak
+        JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+        WHERE B.Status_Lokasi = ?
+        """
+        return self.cached_rows(query, (status,))
+
+    @traced
+    def get_book_row(self, book_id):
+        """Get one book as a tuple in BOOK_COLUMNS order"""
+        query = """
+        SELECT B.ID_Buku, R.Nama_Rak, K.Nama_Kategori, B.Tahun_Cetak,
+               B.No_Kendali_Min, B.No_Kendali_Max, B.Warna_Sampul, B.Subkategori,
+               B.Status_Kondisi, B.Status_Lokasi
+        FROM BUKU B
+        JOIN RAK R ON B.ID_Rak = R.ID_Rak
+        JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+        WHERE B.ID_Buku = ?
+        """
+        rows = self.fetch_rows(query, (book_id,))
+        return rows[0] if rows else None
 
+    @traced
+    def get_book_rows(self, book_ids):
+        """Get many books as tuples in BOOK_COLUMNS order"""
+        query = """
+        SELECT B.ID_Buku, R.Nama_Rak, K.Nama_Kategori, B.Tahun_Cetak,
+               B.No_Kendali_Min, B.No_Kendali_Max, B.Warna_Sampul, B.Subkategori,
+               B.Status_Kondisi, B.Status_Lokasi
+        FROM BUKU B
+        JOIN RAK R ON B.ID_Rak = R.ID_Rak
+        JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+        WHERE B.ID_Buku IN (SELECT value FROM json_each(?))
+        """
+        return self.fetch_rows(query, (json.dumps(list(book_ids)),))
+
+    @traced
+    def get_rak_book_ids(self, book_id, status):
+        """Get the IDs of books with a given status on the same rak as book_id"""
+        query = """
+        SELECT ID_Buku FROM BUKU
+        WHERE ID_Rak = (SELECT ID_Rak FROM BUKU WHERE ID_Buku = ?)
+          AND Status_Lokasi = ?
+        ORDER BY ID_Buku
+        """
+        rows = self.fetch_rows(query, (book_id, status))
+        return None if rows is None else [row[0] for row in rows]
+
+    @traced
     def search_book(self, nomor_kendali):
         """Search book by control number"""
         query = """
         SELECT B.*, R.Nama_Rak, K.Nama_Kategori 
-        FROM BUKU B
+        FROM BUKU_RENTANG T
+        JOIN BUKU B ON B.ID_Buku = T.ID_Buku
+        JOIN RAK R ON B.ID_Rak = R.ID_Rak
+        JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+        WHERE T.No_Kendali_Min <= ?1 AND T.No_Kendali_Max >= ?1
+        ORDER BY B.rowid
+        LIMIT 1
+        """
+        return self.cached_query(query, (nomor_kendali,), fetch_one=True)
+
+    @traced
+    def search_book_matches(self, nomor_kendali, id_kategori=None, tahun=None):
+        """Get every book whose range holds the control number, optionally
+        limited to one category and/or printing year"""
+        query = SEARCH_QUERIES[(id_kategori is not None, tahun is not None)]
+        params = (nomor_kendali, id_kategori, tahun)
+        if tahun is None:
+            params = params[:2] if id_kategori is not None else params[:1]
+        return self.cached_query(query, params)
+
+    @traced
+    def search_books(self, numbers, id_kategori=None, tahun=None):
+        """Search many control numbers in one query, returning {nomor: [books]}"""
+        numbers = sorted({int(n) for n in numbers})
+        if not numbers:
+            return {}
+        query = """
+        SELECT N.value AS Nomor_Dicari, B.*, R.Nama_Rak, K.Nama_Kategori
+        FROM json_each(?1) N
+        CROSS JOIN BUKU_RENTANG T
+          ON T.No_Kendali_Min <= N.value AND T.No_Kendali_Max >= N.value
+        JOIN BUKU B ON B.ID_Buku = T.ID_Buku
         JOIN RAK R ON B.ID_Rak = R.ID_Rak
         JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
-        WHERE ? BETWEEN B.No_Kendali_Min AND B.No_Kendali_Max
+        WHERE (?2 IS NULL OR B.ID_Kategori = ?2)
+          AND (?3 IS NULL OR B.Tahun_Cetak = ?3)
+        ORDER BY N.value, B.ID_Kategori, B.Tahun_Cetak, B.ID_Buku
         """
-        return self.execute_query(query, (nomor_kendali,), fetch_one=True)
+        rows = self.execute_query(query, (json.dumps(numbers), id_kategori, tahun))
+        if rows is None:
+            return None
+        result = {}
+        for row in rows:
+            nomor = row.pop("Nomor_Dicari")
+            result.setdefault(nomor, []).append(row)
+        return result
 
+    @traced
+    def search_books_text(self, text, id_kategori=None, tahun=None, limit=100):
+        """Free-text search over book attributes, rak and category names
+
+        Books whose own attributes match come first, ranked by bm25 with
+        Subkategori weighted highest; they are followed by books whose
+        activity log details match.
+        """
+        match = fts_query(text)
+        if not match:
+            return []
+        book_query = """
+        SELECT B.*, R.Nama_Rak, K.Nama_Kategori
+        FROM BUKU_FTS F
+        JOIN BUKU B ON B.ID_Buku = F.ID_Buku
+        JOIN RAK R ON B.ID_Rak = R.ID_Rak
+        JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+        WHERE BUKU_FTS MATCH ?1
+          AND (?2 IS NULL OR B.ID_Kategori = ?2)
+          AND (?3 IS NULL OR B.Tahun_Cetak = ?3)
+        ORDER BY bm25(BUKU_FTS, 0.0, 4.0, 3.0, 2.0, 2.0, 1.0), B.ID_Buku
+        LIMIT ?4
+        """
+        log_query = """
+        SELECT B.*, R.Nama_Rak, K.Nama_Kategori
+        FROM (
+            SELECT L.ID_Buku, min(F.rank) AS Skor
+            FROM LOG_FTS F
+            JOIN LOG_AKTIVITAS L ON L.ID_Log = F.rowid
+            WHERE LOG_FTS MATCH ?1
+            GROUP BY L.ID_Buku
+        ) H
+        JOIN BUKU B ON B.ID_Buku = H.ID_Buku
+        JOIN RAK R ON B.ID_Rak = R.ID_Rak
+        JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+        WHERE (?2 IS NULL OR B.ID_Kategori = ?2)
+          AND (?3 IS NULL OR B.Tahun_Cetak = ?3)
+        ORDER BY H.Skor, B.ID_Buku
+        LIMIT ?4
+        """
+        params = (match, id_kategori, tahun, limit)
+        books = self.cached_query(book_query, params)
+        logged = self.cached_query(log_query, params, tables=BOOK_TABLES + ("LOG_AKTIVITAS",))
+        if books is None or logged is None:
+            return None
+        found = {book["ID_Buku"]: book for book in books}
+        for book in logged:
+            found.setdefault(book["ID_Buku"], book)
+        return list(found.values())[:limit]
+
+    @traced
+    def get_search_options(self):
+        """Get the categories and printing years that occur in BUKU
+
+        Read from the status counters, so this does not scan BUKU.
+        Returns {"kategori": [(ID_Kategori, Nama_Kategori)], "tahun": [year]}.
+        """
+        kategori = self.cached_rows("""
+        SELECT K.ID_Kategori, K.Nama_Kategori FROM KATEGORI K
+        WHERE EXISTS (SELECT 1 FROM STATISTIK_KATEGORI S
+                      WHERE S.ID_Kategori = K.ID_Kategori AND S.Jumlah > 0)
+        ORDER BY K.ID_Kategori
+        """)
+        tahun = self.cached_rows("""
+        SELECT DISTINCT Tahun_Cetak FROM STATISTIK_KATEGORI
+        WHERE Jumlah > 0 AND Tahun_Cetak != 0
+        ORDER BY Tahun_Cetak
+        """)
+        if kategori is None or tahun is None:
+            return None
+        return {"kategori": kategori, "tahun": [row[0] for row in tahun]}
+
+    @traced
+    def get_overlapping_books(self, nomor_min, nomor_max, id_kategori=None, tahun=None):
+        """Get books whose control number range overlaps [nomor_min, nomor_max]"""
+        query = """
+        SELECT B.ID_Buku, B.ID_Kategori, B.Tahun_Cetak,
+               B.No_Kendali_Min, B.No_Kendali_Max
+        FROM BUKU_RENTANG T
+        JOIN BUKU B ON B.ID_Buku = T.ID_Buku
+        WHERE T.No_Kendali_Min <= ?2 AND T.No_Kendali_Max >= ?1
+          AND (?3 IS NULL OR B.ID_Kategori = ?3)
+          AND (?4 IS NULL OR B.Tahun_Cetak = ?4)
+        ORDER BY B.No_Kendali_Min
+        """
+        return self.execute_query(query, (nomor_min, nomor_max, id_kategori, tahun))
+
+    @traced
+    def find_overlapping_ranges(self):
+        """Find pairs of books in the same category and year with overlapping ranges"""
+        query = """
+        SELECT A.ID_Buku AS ID_Buku_A, B.ID_Buku AS ID_Buku_B,
+               A.ID_Kategori, A.Tahun_Cetak,
+               A.No_Kendali_Min AS Min_A, A.No_Kendali_Max AS Max_A,
+               B.No_Kendali_Min AS Min_B, B.No_Kendali_Max AS Max_B
+        FROM BUKU_RENTANG TA
+        JOIN BUKU_RENTANG TB
+          ON TB.No_Kendali_Min <= TA.No_Kendali_Max
+         AND TB.No_Kendali_Max >= TA.No_Kendali_Min
+         AND TB.ID_Buku > TA.ID_Buku
+        JOIN BUKU A ON A.ID_Buku = TA.ID_Buku
+        JOIN BUKU B ON B.ID_Buku = TB.ID_Buku
+        WHERE A.ID_Kategori = B.ID_Kategori AND A.Tahun_Cetak = B.Tahun_Cetak
+        ORDER BY A.ID_Kategori, A.Tahun_Cetak, A.No_Kendali_Min
+        """
+        return self.execute_query(query)
+
+    @traced
+    def rebuild_range_index(self):
+        """Rebuild the control number range index from BUKU"""
+        try:
+            with self.transaction() as conn:
+                rebuild_range_index(conn)
+            return True
+        except sqlite3.Error as e:
+            print(f"Index error: {e}")
+            return False
+
+    @traced
     def update_location_status(self, book_id, new_status):
         """Update book location status"""
         query = "UPDATE BUKU SET Status_Lokasi = ? WHERE ID_Buku = ?"
+        rowcount = self.execute_write(query, (new_status, book_id))
+        return bool(rowcount)
+
+    @traced
+    def log_activity(self, user_id, book_id, action_type, details):
+        """Log user activity, through the background log writer when one is running"""
+        return self.queue_log([(user_id, book_id, action_type, details, None, None)])
+
+    @traced
+    def write_log_rows(self, rows):
+        """Insert complete LOG_AKTIVITAS rows in one transaction"""
+        return self.execute_many(LOG_INSERT, rows)
+
+    def queue_log(self, entries):
+        """Log (user_id, book_id, action_type, details, before, after) entries
+
+        With a running log writer the entries are queued and this returns
+        at once; otherwise they are written synchronously.
+        """
+        writer = log_writer_for(self.pool)
+        if writer is not None:
+            writer.log_many(entries)
+            return len(entries)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return self.write_log_rows([
+            (user_id, book_id, action_type, details, timestamp, before, after)
+            for user_id, book_id, action_type, details, before, after in entries
+        ])
+
+    @traced
+    def transition_book(self, book_id, new_status, user_id, action_type, details=None):
+        """Change a book's location status and log it
+
+        Without a log writer the log row goes into the same transaction;
+        with one, it is queued once the status change has committed.
+        Returns the previous status; False, without writing anything, if
+        the book is already in new_status (transition_books skips those
+        books too); or None if the book does not exist, its status was
+        changed by someone else in the meantime, or on error.
+        """
+        if details is None:
+            details = f"Status diubah ke {new_status}"
+        writer = log_writer_for(self.pool)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            cur = self.conn.cursor()
-            cur.execute(query, (new_status, book_id))
-            self.conn.commit()
-            return cur.rowcount > 0
+            with self.transaction() as conn:
+                row = self._execute(
+                    conn, "SELECT Status_Lokasi FROM BUKU WHERE ID_Buku = ?", (book_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                old_status = row[0]
+                if old_status == new_status:
+                    return False
+                cur = self._execute(
+                    conn, "UPDATE BUKU SET Status_Lokasi = ? WHERE ID_Buku = ? AND Status_Lokasi IS ?",
+                    (new_status, book_id, old_status)
+                )
+                if cur.rowcount == 0:
+                    return None
+                if writer is None:
+                    conn.execute(LOG_INSERT, (
+                        user_id, book_id, action_type, details, timestamp, old_status, new_status
+                    ))
+                    self.invalidate_cache("BUKU", "LOG_AKTIVITAS")
+                else:
+                    self.invalidate_cache("BUKU")
+            if writer is not None:
+                self.queue_log([(user_id, book_id, action_type, details, old_status, new_status)])
+            return old_status
         except sqlite3.Error as e:
-            print(f"Update error: {e}")
-            return False
+            print(f"Transition error: {e}")
+            return None
 
-    def log_activity(self, user_id, book_id, action_type, details):
-        """Log user activity"""
-        query = """
-        INSERT INTO LOG_AKTIVITAS 
-        (ID_Pengguna, ID_Buku, Jenis_Aksi, Detail_Perubahan, Waktu)
-        VALUES (?, ?, ?, ?, ?)
+    @traced
+    def transition_books(self, book_ids, new_status, user_id, action_type, details=None):
+        """Change the status of many books in one transaction and log them
+
+        The log rows are written as in transition_book. Books already in
+        new_status are skipped. Returns a list of (book_id, previous_status)
+        for every book that was changed, or None on error.
         """
+        if details is None:
+            details = f"Status diubah ke {new_status}"
+        writer = log_writer_for(self.pool)
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return self.execute_query(query, (user_id, book_id, action_type, details, timestamp))
+        book_ids = list(dict.fromkeys(book_ids))
+        if not book_ids:
+            return []
+        try:
+            with self.transaction() as conn:
+                rows = self._execute(conn, """
+                SELECT ID_Buku, Status_Lokasi FROM BUKU
+                WHERE ID_Buku IN (SELECT value FROM json_each(?))
+                """, (json.dumps(book_ids),)).fetchall()
+                changed = [(row[0], row[1]) for row in rows if row[1] != new_status]
+                conn.executemany(
+                    "UPDATE BUKU SET Status_Lokasi = ? WHERE ID_Buku = ? AND Status_Lokasi IS ?",
+                    [(new_status, book_id, old_status) for book_id, old_status in changed]
+                )
+                if writer is None:
+                    conn.executemany(LOG_INSERT, [
+                        (user_id, book_id, action_type, details, timestamp, old_status, new_status)
+                        for book_id, old_status in changed
+                    ])
+                if changed:
+                    self.invalidate_cache("BUKU", "LOG_AKTIVITAS")
+            if writer is not None and changed:
+                self.queue_log([
+                    (user_id, book_id, action_type, details, old_status, new_status)
+                    for book_id, old_status in changed
+                ])
+            return changed
+        except sqlite3.Error as e:
+            print(f"Transition error: {e}")
+            return None
+
+    @traced
+    def get_stats(self):
+        """Get book counts per location status from the counter tables
+
+        Returns a dict with the overall counts ("total") and breakdowns per
+        category ("kategori"), per category and year ("tahun") and per rak
+        ("rak"); every row holds Di_Rak, Di_Lantai, Dipinjam and Total.
+        """
+        columns = """
+            sum(CASE WHEN S.Status_Lokasi = 'Di Rak' THEN S.Jumlah ELSE 0 END) AS Di_Rak,
+            sum(CASE WHEN S.Status_Lokasi = 'Di Lantai' THEN S.Jumlah ELSE 0 END) AS Di_Lantai,
+            sum(CASE WHEN S.Status_Lokasi = 'Dipinjam' THEN S.Jumlah ELSE 0 END) AS Dipinjam,
+            sum(S.Jumlah) AS Total
+        """
+        queries = {
+            "total": f"""
+            SELECT {columns} FROM STATISTIK_KATEGORI S
+            """,
+            "kategori": f"""
+            SELECT S.ID_Kategori, K.Nama_Kategori, {columns}
+            FROM STATISTIK_KATEGORI S
+            LEFT JOIN KATEGORI K ON S.ID_Kategori = K.ID_Kategori
+            GROUP BY S.ID_Kategori
+            HAVING Total > 0
+            ORDER BY S.ID_Kategori
+            """,
+            "tahun": f"""
+            SELECT S.ID_Kategori, K.Nama_Kategori, S.Tahun_Cetak, {columns}
+            FROM STATISTIK_KATEGORI S
+            LEFT JOIN KATEGORI K ON S.ID_Kategori = K.ID_Kategori
+            GROUP BY S.ID_Kategori, S.Tahun_Cetak
+            HAVING Total > 0
+            ORDER BY S.ID_Kategori, S.Tahun_Cetak
+            """,
+            "rak": f"""
+            SELECT S.ID_Rak, R.Nama_Rak, {columns}
+            FROM STATISTIK_RAK S
+            LEFT JOIN RAK R ON S.ID_Rak = R.ID_Rak
+            GROUP BY S.ID_Rak
+            HAVING Total > 0
+            ORDER BY S.ID_Rak
+            """,
+        }
+        stats = {}
+        try:
+            with self.pool.reader() as conn:
+                # One read transaction, so all four breakdowns come from the
+                # same snapshot and add up to the same total
+                own_transaction = not conn.in_transaction
+                if own_transaction:
+                    conn.execute("BEGIN")
+                try:
+                    for key, query in queries.items():
+                        started = time.perf_counter()
+                        rows = [dict(row) for row in conn.execute(query)]
+                        self._record_statement(conn, "execute_query", query, (), started, len(rows))
+                        stats[key] = rows
+                finally:
+                    if own_transaction:
+                        conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return None
+        stats["total"] = stats["total"][0]
+        return stats
+
+    @traced
+    def get_log_page(self, filters=None, after=None, limit=LOG_PAGE_SIZE):
+        """Get one page of the activity log, newest first, as row tuples
+
+        Pages are keyset-paginated on (Waktu, ID_Log): `after` is the
+        (Waktu, ID_Log) of the last row of the previous page, so every page
+        is an index range scan no matter how deep into the log it is.
+        The live table is read first, then the per-year archive files
+        from newest to oldest, attached only while they are read.
+        filters may hold user_id, book_id, action, date_from and date_to
+        (inclusive dates as YYYY-MM-DD), and text to match in
+        Detail_Perubahan: by word prefix through LOG_FTS in the live log,
+        by substring in the archives.
+        """
+        filters = filters or {}
+        conditions = []
+        params = []
+        if filters.get("user_id") is not None:
+            conditions.append("L.ID_Pengguna = ?")
+            params.append(filters["user_id"])
+        if filters.get("book_id"):
+            conditions.append("L.ID_Buku = ?")
+            params.append(filters["book_id"])
+        if filters.get("action"):
+            conditions.append("L.Jenis_Aksi = ?")
+            params.append(filters["action"])
+        if filters.get("date_from"):
+            conditions.append("L.Waktu >= ?")
+            params.append(filters["date_from"])
+        if filters.get("date_to"):
+            conditions.append("L.Waktu < date(?, '+1 day')")
+            params.append(filters["date_to"])
+        # The live log is searched through LOG_FTS; archive files carry no
+        # full-text index, so there every word must appear in the text
+        live_conditions, live_params = list(conditions), list(params)
+        text = fts_query(filters.get("text") or "")
+        if text:
+            live_conditions.append("L.ID_Log IN (SELECT rowid FROM LOG_FTS WHERE LOG_FTS MATCH ?)")
+            live_params.append(text)
+            for word in re.findall(r"\w+", filters["text"]):
+                conditions.append("L.Detail_Perubahan LIKE ? ESCAPE '\\'")
+                params.append("%" + word.replace("_", "\\_") + "%")
+        if after is not None:
+            for where_conditions, where_params in ((live_conditions, live_params),
+                                                   (conditions, params)):
+                where_conditions.append("(L.Waktu, L.ID_Log) < (?, ?)")
+                where_params.extend(after)
+        live_where = f"WHERE {' AND '.join(live_conditions)}" if live_conditions else ""
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = """
+        SELECT L.ID_Log, L.Waktu, P.Username, L.ID_Buku, L.Jenis_Aksi,
+               L.Detail_Perubahan, L.Status_Sebelum, L.Status_Sesudah
+        FROM {schema}.LOG_AKTIVITAS L
+        LEFT JOIN main.PENGGUNA P ON L.ID_Pengguna = P.ID_Pengguna
+        {where}
+        ORDER BY L.Waktu DESC, L.ID_Log DESC
+        LIMIT ?
+        """
+
+        def wanted(year):
+            # Skip archive years wholly outside the filter or the page key
+            first, last = f"{year}-01-01", f"{year}-12-31 99"
+            return not ((after is not None and after[0] < first)
+                        or (filters.get("date_from") or "") > last
+                        or (filters.get("date_to") or "9999") < first)
+
+        archives = [path for year, path in archive_files(archive_dir(self.db_path)) if wanted(year)]
+        try:
+            with self.pool.reader() as conn:
+                cur = conn.cursor()
+                cur.row_factory = None
+                live = query.format(schema="main", where=live_where)
+                started = time.perf_counter()
+                rows = cur.execute(live, (*live_params, limit)).fetchall()
+                self._record_statement(conn, "get_log_page", live, (*live_params, limit), started, len(rows))
+                for path in archives:
+                    if len(rows) >= limit:
+                        break
+                    cur.execute("ATTACH DATABASE ? AS arsip", (str(path),))
+                    try:
+                        archived = query.format(schema="arsip", where=where)
+                        args = (*params, limit - len(rows))
+                        started = time.perf_counter()
+                        more = cur.execute(archived, args).fetchall()
+                        self._record_statement(conn, "get_log_page", archived, args, started, len(more))
+                        rows += more
+                    finally:
+                        cur.execute("DETACH DATABASE arsip")
+                return rows
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            return None
+
+    @traced
+    def get_log_summary(self, date_from=None, date_to=None):
+        """Get per-day, per-action log counts, live and archived, newest day first"""
+        return self.cached_query("""
+        SELECT Tanggal, Jenis_Aksi, Jumlah FROM LOG_RINGKASAN
+        WHERE Tanggal >= ? AND Tanggal <= ?
+        ORDER BY Tanggal DESC, Jenis_Aksi
+        """, (date_from or "", date_to or "9999"), tables=("LOG_AKTIVITAS",))
+
+    @traced
+    def archive_logs(self, horizon_days=365, progress=None):
+        """Move log rows older than horizon_days into per-year archive files"""
+        try:
+            return archive_logs(self, horizon_days, progress=progress)
+        except sqlite3.Error as e:
+            print(f"Archive error: {e}")
+            return None
+
+    @traced
+    def get_users(self):
+        """Get every user's ID and username, without passwords"""
+        return self.cached_query(
+            "SELECT ID_Pengguna, Username FROM PENGGUNA ORDER BY Username",
+            tables=("PENGGUNA",)
+        )
 
+    @traced
     def authenticate_user(self, username: object, password: object) -> dict[Any, Any] | dict[str, Any] | dict[str, str] | dict[bytes, bytes] | None | list[dict[Any, Any] | dict[str, Any] | dict[str, str] | dict[bytes, bytes]]:
         """Authenticate user credentials"""
         query = "SELECT * FROM PENGGUNA WHERE Username = ? AND Password = ?"
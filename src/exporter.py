@@ -0,0 +1,175 @@
+# exporter.py
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+
+# PENGGUNA is left out on purpose: it holds passwords
+EXPORT_TABLES = ("KATEGORI", "RAK", "BUKU", "LOG_AKTIVITAS")
+EXPORT_FORMATS = ("csv", "jsonl.gz")
+MANIFEST_NAME = "manifest.json"
+
+
+def _encode_csv(columns, rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _encode_jsonl_gz(columns, rows, header):
+    lines = "".join(
+        json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows
+    )
+    # Every batch is its own gzip member; concatenated members are a valid
+    # gzip file, which keeps the resume offsets byte-exact.
+    return gzip.compress(lines.encode("utf-8"))
+
+
+ENCODERS = {"csv": _encode_csv, "jsonl.gz": _encode_jsonl_gz}
+
+
+def _load_manifest(out_dir, fmt):
+    path = out_dir / MANIFEST_NAME
+    if path.exists():
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if manifest.get("format") == fmt and not manifest.get("complete"):
+            return manifest
+    return {
+        "format": fmt,
+        "complete": False,
+        "tables": {table: {"last_rowid": 0, "offset": 0, "rows": 0, "done": False}
+                   for table in EXPORT_TABLES},
+    }
+
+
+def _save_manifest(out_dir, manifest):
+    path = out_dir / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def export_tables(db, out_dir, fmt="csv", batch_size=1000, progress=None):
+    """Stream BUKU, RAK, KATEGORI and LOG_AKTIVITAS to one file per table
+
+    Rows are read with keyset pagination on rowid in fetchmany-sized
+    batches and appended to <table>.csv or <table>.jsonl.gz, so memory
+    stays constant whatever the table size. manifest.json records the
+    last exported rowid and file offset after every batch; running the
+    export again into the same directory resumes an unfinished export.
+    Returns the manifest.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+    encode = ENCODERS[fmt]
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(out_dir, fmt)
+
+    with db.pool.reader() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        # One read transaction for the whole run: a consistent WAL snapshot
+        cur.execute("BEGIN")
+        try:
+            totals = {table: cur.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                      for table in EXPORT_TABLES}
+            grand_total = sum(totals.values())
+            done = sum(manifest["tables"][table]["rows"] for table in EXPORT_TABLES)
+
+            for table in EXPORT_TABLES:
+                state = manifest["tables"][table]
+                if state["done"]:
+                    continue
+                path = out_dir / f"{table}.{fmt}"
+                with open(path, "ab") as f:
+                    f.truncate(state["offset"])
+                    f.seek(state["offset"])
+                    cur.execute(
+                        f"SELECT rowid, * FROM {table} WHERE rowid > ? ORDER BY rowid",
+                        (state["last_rowid"],)
+                    )
+                    columns = [d[0] for d in cur.description][1:]
+                    header = state["offset"] == 0
+                    while True:
+                        batch = cur.fetchmany(batch_size)
+                        if not batch:
+                            break
+                        f.write(encode(columns, [row[1:] for row in batch], header))
+                        f.flush()
+                        header = False
+                        state["last_rowid"] = batch[-1][0]
+                        state["offset"] = f.tell()
+                        state["rows"] += len(batch)
+                        _save_manifest(out_dir, manifest)
+                        done += len(batch)
+                        if progress is not None:
+                            progress(done, max(grand_total, done))
+                    if header and fmt == "csv":
+                        # Empty table: still write the header line
+                        f.write(encode(columns, [], True))
+                        state["offset"] = f.tell()
+                state["done"] = True
+                _save_manifest(out_dir, manifest)
+        finally:
+            cur.execute("COMMIT")
+
+    manifest["complete"] = True
+    _save_manifest(out_dir, manifest)
+    return manifest
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+def export_snapshot(db, dest_path, pages=256, pause=0.0, progress=None, max_restarts=3):
+    """Copy the whole database to dest_path with the SQLite backup API
+
+    The copy runs in steps of `pages` pages so writers are only briefly
+    held up; the result is a consistent snapshot of a single point in time.
+    A write from another connection between steps restarts the copy;
+    after max_restarts restarts the rest is copied in a single step,
+    inside one read transaction that writes cannot restart.
+    """
+    dest_path = Path(dest_path)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest_path.with_name(dest_path.name + ".part")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    restarts = 0
+    last_remaining = None
+
+    def on_step(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if progress is not None:
+            progress(total - remaining, total)
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _BackupRestarted()
+        last_remaining = remaining
+        if pause:
+            time.sleep(pause)
+
+    dest = sqlite3.connect(str(tmp_path))
+    try:
+        with db.pool.reader() as conn:
+            try:
+                conn.backup(dest, pages=pages, progress=on_step)
+            except _BackupRestarted:
+                conn.backup(dest, pages=-1)
+        # A standalone file: no -wal/-shm companions when it is opened later
+        dest.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dest.close()
+    tmp_path.replace(dest_path)
+    return dest_path
@@ -0,0 +1,288 @@
+# importer.py
+import csv
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from schema import rebuild_derived
+
+
+BUKU_FIELDS = (
+    "ID_Buku", "ID_Rak", "ID_Kategori", "Tahun_Cetak",
+    "No_Kendali_Min", "No_Kendali_Max", "Warna_Sampul", "Subkategori",
+    "Status_Kondisi", "Status_Lokasi",
+)
+INTEGER_FIELDS = ("ID_Kategori", "Tahun_Cetak", "No_Kendali_Min", "No_Kendali_Max")
+STATUS_KONDISI = ("Baik", "Rusak", "Hilang")
+STATUS_LOKASI = ("Di Rak", "Di Lantai", "Dipinjam")
+# BUKU_RENTANG holds signed 32-bit coordinates
+NO_KENDALI_MIN, NO_KENDALI_MAX = -2 ** 31, 2 ** 31 - 1
+
+INSERT_BUKU = f"""
+INSERT INTO BUKU ({", ".join(BUKU_FIELDS)})
+VALUES ({", ".join("?" for _ in BUKU_FIELDS)})
+"""
+UPDATE_BUKU = f"""
+UPDATE BUKU SET {", ".join(f"{field} = ?" for field in BUKU_FIELDS[1:])}
+WHERE ID_Buku = ?
+"""
+SELECT_EXISTING = f"""
+SELECT {", ".join(BUKU_FIELDS)} FROM BUKU
+WHERE ID_Buku IN (SELECT value FROM json_each(?))
+"""
+LOG_EDIT = """
+INSERT INTO LOG_AKTIVITAS
+(ID_Pengguna, ID_Buku, Jenis_Aksi, Detail_Perubahan, Waktu, Status_Sebelum, Status_Sesudah)
+VALUES (?, ?, 'Edit', ?, ?, ?, ?)
+"""
+
+# Imports up to this many rows keep the BUKU indexes and triggers, which
+# maintain the derived tables row by row; larger ones drop them and
+# rebuild everything once at the end
+BULK_ROWS = 20000
+
+
+class ImportResult:
+    """Counters and per-row problems collected during an import"""
+
+    def __init__(self):
+        self.total = 0
+        self.imported = 0
+        self.updated = 0
+        self.rejected = []   # (row number, ID_Buku, reason)
+        self.overlaps = []   # (row number, ID_Buku, reason)
+        self.report_path = None
+
+    @property
+    def problems(self):
+        return self.rejected + self.overlaps
+
+
+def count_rows(path):
+    """Count data rows of a CSV file without parsing it"""
+    lines = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0)
+
+
+def read_chunks(path, chunksize):
+    """Return the number of data rows and an iterator of DataFrame chunks
+    of every BUKU column as strings"""
+    path = Path(path)
+    if path.suffix.lower() in (".xlsx", ".xls"):
+        # Excel files cannot be read incrementally; slice them instead
+        frame = pd.read_excel(path, dtype=str)
+        return len(frame), (frame.iloc[start:start + chunksize]
+                            for start in range(0, len(frame), chunksize))
+    return count_rows(path), pd.read_csv(path, dtype=str, chunksize=chunksize,
+                                         keep_default_na=False, na_values=[""])
+
+
+def validate_chunk(chunk, known_raks, known_kategori, seen_ids):
+    """Validate one chunk with vectorized checks
+
+    Returns the clean rows as a DataFrame plus a Series of rejection
+    reasons indexed like the rejected rows.
+    """
+    missing = [field for field in BUKU_FIELDS if field not in chunk.columns]
+    if missing:
+        raise ValueError(f"Kolom tidak ditemukan: {', '.join(missing)}")
+
+    frame = chunk.loc[:, BUKU_FIELDS].copy()
+    for field in ("ID_Buku", "ID_Rak", "Status_Kondisi", "Status_Lokasi"):
+        frame[field] = frame[field].str.strip()
+    for field in INTEGER_FIELDS:
+        frame[field] = pd.to_numeric(frame[field], errors="coerce")
+
+    checks = [
+        (frame["ID_Buku"].isna() | (frame["ID_Buku"] == ""), "ID_Buku kosong"),
+        (frame["ID_Buku"].duplicated() | frame["ID_Buku"].isin(seen_ids), "ID_Buku duplikat"),
+        (frame[list(INTEGER_FIELDS)].isna().any(axis=1), "Kolom angka kosong atau tidak valid"),
+        (~frame["ID_Rak"].isin(known_raks), "ID_Rak tidak dikenal"),
+        (~frame["ID_Kategori"].isin(known_kategori), "ID_Kategori tidak dikenal"),
+        (~frame["Status_Kondisi"].isin(STATUS_KONDISI), "Status_Kondisi tidak valid"),
+        (~frame["Status_Lokasi"].isin(STATUS_LOKASI), "Status_Lokasi tidak valid"),
+        (frame["No_Kendali_Min"] > frame["No_Kendali_Max"], "No_Kendali_Min lebih besar dari No_Kendali_Max"),
+        (~frame["No_Kendali_Min"].between(NO_KENDALI_MIN, NO_KENDALI_MAX)
+         | ~frame["No_Kendali_Max"].between(NO_KENDALI_MIN, NO_KENDALI_MAX),
+         "No_Kendali di luar rentang 32-bit"),
+    ]
+    masks = [mask.to_numpy(dtype=bool) for mask, _ in checks]
+    reasons = np.select(masks, [reason for _, reason in checks], default="")
+    bad = reasons != ""
+
+    valid = frame[~bad].copy()
+    for field in INTEGER_FIELDS:
+        valid[field] = valid[field].astype("int64")
+    seen_ids.update(valid["ID_Buku"])
+    return valid, pd.Series(reasons[bad], index=frame.index[bad])
+
+
+def find_overlaps(new_ranges, existing_ranges):
+    """Flag new ranges that overlap any other range of the same category and year
+
+    Both arguments are DataFrames with ID_Kategori, Tahun_Cetak,
+    No_Kendali_Min and No_Kendali_Max; new_ranges also carries the file
+    row number in Baris. Returns the overlapping rows of new_ranges.
+    """
+    keys = ["ID_Kategori", "Tahun_Cetak"]
+    combined = pd.concat([
+        new_ranges.assign(Baru=True),
+        existing_ranges.assign(Baru=False, Baris=-1, ID_Buku=None),
+    ], ignore_index=True)
+    combined = combined.sort_values(keys + ["No_Kendali_Min"], kind="mergesort")
+    # Sorted by start: a range overlaps an earlier one when it starts before
+    # the running maximum end, and a later one when the next start is
+    # before its own end.
+    combined["Max_Berjalan"] = combined.groupby(keys, sort=False)["No_Kendali_Max"].cummax()
+    groups = combined.groupby(keys, sort=False)
+    previous_end = groups["Max_Berjalan"].shift(1)
+    next_start = groups["No_Kendali_Min"].shift(-1)
+    overlaps = (combined["No_Kendali_Min"] <= previous_end) | (next_start <= combined["No_Kendali_Max"])
+    return combined[overlaps & combined["Baru"]].sort_values("Baris")
+
+
+def write_report(path, problems):
+    """Write rejected and overlapping rows to a CSV error report"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Baris", "ID_Buku", "Keterangan"])
+        writer.writerows(problems)
+
+
+def changed_fields(old, new):
+    """Detail_Perubahan text for the fields that differ between two BUKU rows"""
+    return "; ".join(
+        f"{field}: {old[field]} -> {value}"
+        for field, value in zip(BUKU_FIELDS, new) if old[field] != value
+    )
+
+
+def import_books(db, path, chunksize=5000, reject_overlaps=False,
+                 update_existing=False, user_id=None, progress=None):
+    """Import BUKU rows from a CSV or Excel file in a single transaction
+
+    Rows are read and validated chunk by chunk and loaded with
+    executemany. Rows whose ID_Buku already exists are rejected, unless
+    update_existing is set: then the existing book is updated and every
+    changed book gets an 'Edit' row in LOG_AKTIVITAS under user_id.
+    Imports of more than BULK_ROWS rows drop the secondary indexes and
+    triggers on BUKU for the load and rebuild them and the derived tables
+    afterwards. Rows whose control number range overlaps another book of
+    the same category and year are reported, and left out when
+    reject_overlaps is set. Problems are written to <file>.errors.csv
+    next to the input.
+    """
+    if update_existing and user_id is None:
+        raise ValueError("user_id diperlukan untuk memperbarui buku yang sudah ada")
+    path = Path(path)
+    result = ImportResult()
+    total, chunks = read_chunks(path, chunksize)
+
+    known_raks = {row["ID_Rak"] for row in db.execute_query("SELECT ID_Rak FROM RAK")}
+    known_kategori = {row["ID_Kategori"] for row in db.execute_query("SELECT ID_Kategori FROM KATEGORI")}
+    seen_ids = set()
+    loaded = []
+    previous = {}  # ID_Buku -> row before an update
+    edits = []     # LOG_AKTIVITAS rows for the updates
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with db.transaction() as conn:
+        saved = []
+        if total > BULK_ROWS:
+            saved = conn.execute("""
+            SELECT type, name, sql FROM sqlite_master
+            WHERE tbl_name = 'BUKU' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+            """).fetchall()
+            for obj_type, name, _ in saved:
+                conn.execute(f"DROP {obj_type.upper()} IF EXISTS {name}")
+
+        for chunk in chunks:
+            first_row = result.total + 2  # header is line 1
+            chunk = chunk.reset_index(drop=True)
+            valid, reasons = validate_chunk(chunk, known_raks, known_kategori, seen_ids)
+            for index, reason in reasons.items():
+                book_id = chunk.at[index, "ID_Buku"] if "ID_Buku" in chunk.columns else None
+                result.rejected.append((first_row + index, book_id, reason))
+
+            existing = {row["ID_Buku"]: row for row in conn.execute(
+                SELECT_EXISTING, (valid["ID_Buku"].to_json(orient="values"),)
+            )}
+            is_existing = valid["ID_Buku"].isin(existing).to_numpy()
+            if not update_existing:
+                for index, book_id in valid.loc[is_existing, "ID_Buku"].items():
+                    result.rejected.append((first_row + index, book_id, "ID_Buku sudah ada"))
+
+            records = valid.astype(object).where(valid.notna(), None)
+            conn.executemany(INSERT_BUKU, records[~is_existing].itertuples(index=False, name=None))
+            written = ~is_existing
+            if update_existing:
+                updates = []
+                for position in is_existing.nonzero()[0]:
+                    record = tuple(records.iloc[position])
+                    old = existing[record[0]]
+                    detail = changed_fields(old, record)
+                    if detail:
+                        written[position] = True
+                        previous[record[0]] = tuple(old)
+                        updates.append(record[1:] + record[:1])
+                        edits.append((user_id, record[0], detail, timestamp,
+                                      old["Status_Lokasi"], record[-1]))
+                conn.executemany(UPDATE_BUKU, updates)
+                result.updated += len(updates)
+            # Only rows written by this import are checked for overlaps
+            valid = valid[written]
+            loaded.append(valid[["ID_Buku", "ID_Kategori", "Tahun_Cetak",
+                                 "No_Kendali_Min", "No_Kendali_Max"]].assign(
+                Baris=valid.index.to_numpy() + first_row))
+
+            result.total += len(chunk)
+            result.imported += int((~is_existing).sum())
+            if progress is not None:
+                progress(result.total, max(total, result.total))
+
+        if loaded:
+            new_ranges = pd.concat(loaded, ignore_index=True)
+            cur = conn.cursor()
+            cur.row_factory = None
+            cur.execute("""
+            SELECT ID_Kategori, Tahun_Cetak, No_Kendali_Min, No_Kendali_Max
+            FROM BUKU
+            WHERE ID_Buku NOT IN (SELECT value FROM json_each(?))
+              AND ID_Kategori IS NOT NULL AND Tahun_Cetak IS NOT NULL
+              AND No_Kendali_Min IS NOT NULL AND No_Kendali_Max IS NOT NULL
+            """, (new_ranges["ID_Buku"].to_json(orient="values"),))
+            existing_ranges = pd.DataFrame(
+                cur.fetchall(), columns=list(INTEGER_FIELDS), dtype="int64"
+            )
+            for row in find_overlaps(new_ranges, existing_ranges).itertuples(index=False):
+                result.overlaps.append((
+                    row.Baris, row.ID_Buku,
+                    f"Rentang {row.No_Kendali_Min}-{row.No_Kendali_Max} tumpang tindih"
+                ))
+            if reject_overlaps and result.overlaps:
+                overlapping = {book_id for _, book_id, _ in result.overlaps}
+                # New books are removed again, updated ones get their old row back
+                conn.executemany("DELETE FROM BUKU WHERE ID_Buku = ?",
+                                 [(book_id,) for book_id in overlapping if book_id not in previous])
+                restored = [previous[book_id] for book_id in overlapping if book_id in previous]
+                conn.executemany(UPDATE_BUKU, [old[1:] + old[:1] for old in restored])
+                edits = [edit for edit in edits if edit[1] not in overlapping]
+                result.imported -= len(overlapping) - len(restored)
+                result.updated -= len(restored)
+
+        conn.executemany(LOG_EDIT, edits)
+        if saved:
+            for _, _, sql in saved:
+                conn.execute(sql)
+            rebuild_derived(conn)
+        db.invalidate_cache()
+
+    if result.problems:
+        result.report_path = path.with_name(path.name + ".errors.csv")
+        write_report(result.report_path, sorted(result.problems))
+    return result
@@ -0,0 +1,116 @@
+# log_archive.py
+import re
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+
+ARCHIVE_DIR_NAME = "arsip_log"
+ARCHIVE_PATTERN = re.compile(r"^log-(\d{4})\.sqlite$")
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.LOG_AKTIVITAS (
+        ID_Log INTEGER PRIMARY KEY,
+        ID_Pengguna INTEGER NOT NULL,
+        ID_Buku TEXT NOT NULL,
+        Waktu DATETIME,
+        Jenis_Aksi TEXT,
+        Detail_Perubahan TEXT,
+        Status_Sebelum TEXT,
+        Status_Sesudah TEXT,
+        Status_Aksi TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_log_waktu ON LOG_AKTIVITAS (Waktu, ID_Log)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_log_buku ON LOG_AKTIVITAS (ID_Buku, Waktu, ID_Log)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_log_pengguna ON LOG_AKTIVITAS (ID_Pengguna, Waktu, ID_Log)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_log_aksi ON LOG_AKTIVITAS (Jenis_Aksi, Waktu, ID_Log)",
+]
+
+LOG_FIELDS = (
+    "ID_Log, ID_Pengguna, ID_Buku, Waktu, Jenis_Aksi, Detail_Perubahan, "
+    "Status_Sebelum, Status_Sesudah, Status_Aksi"
+)
+
+
+def archive_dir(db_path):
+    """Archive folder of a database: arsip_log next to the database file"""
+    return Path(db_path).parent / ARCHIVE_DIR_NAME
+
+
+def archive_files(directory):
+    """Archive files by year, newest year first"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    files = []
+    for path in directory.iterdir():
+        match = ARCHIVE_PATTERN.match(path.name)
+        if match:
+            files.append((int(match.group(1)), path))
+    return sorted(files, reverse=True)
+
+
+def archive_logs(db, horizon_days=365, progress=None):
+    """Move LOG_AKTIVITAS rows older than horizon_days into per-year files
+
+    Each year goes to <archive dir>/log-YYYY.sqlite, attached to the write
+    connection. The rows are first copied and committed to the archive,
+    then deleted from the live database in a second transaction, and
+    only where the archive holds them. A crash in between leaves the rows
+    in both files; the copy uses INSERT OR IGNORE, so running it again
+    completes the move. The per-day
+    summary in LOG_RINGKASAN is not touched: it keeps counting archived
+    rows. Returns the number of rows moved.
+    """
+    cutoff = (date.today() - timedelta(days=horizon_days)).isoformat()
+    directory = archive_dir(db.db_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    moved = 0
+
+    years = [row[0] for row in db.fetch_rows("""
+        SELECT DISTINCT substr(Waktu, 1, 4) FROM LOG_AKTIVITAS
+        WHERE Waktu < ? ORDER BY 1
+    """, (cutoff,)) or [] if row[0] and row[0].isdigit()]
+    for done, year in enumerate(years, start=1):
+        path = directory / f"log-{year}.sqlite"
+        start, end = f"{year}-01-01", f"{int(year) + 1}-01-01"
+        with db.pool.exclusive() as conn:
+            conn.execute("ATTACH DATABASE ? AS arsip", (str(path),))
+            try:
+                bounds = (start, min(end, cutoff))
+                # A transaction over two files is not atomic with the main
+                # database in WAL mode, so the copy commits on its own first
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for statement in ARCHIVE_SCHEMA:
+                        conn.execute(statement.format(schema="arsip"))
+                    conn.execute(f"""
+                    INSERT OR IGNORE INTO arsip.LOG_AKTIVITAS ({LOG_FIELDS})
+                    SELECT {LOG_FIELDS} FROM main.LOG_AKTIVITAS
+                    WHERE Waktu >= ? AND Waktu < ?
+                    """, bounds)
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+                # Only rows the archive now holds are deleted
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    cur = conn.execute("""
+                    DELETE FROM main.LOG_AKTIVITAS
+                    WHERE Waktu >= ? AND Waktu < ?
+                      AND ID_Log IN (SELECT ID_Log FROM arsip.LOG_AKTIVITAS)
+                    """, bounds)
+                    moved += cur.rowcount
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            finally:
+                conn.execute("DETACH DATABASE arsip")
+            db.invalidate_cache("LOG_AKTIVITAS")
+        if progress is not None:
+            progress(done, len(years))
+    return moved
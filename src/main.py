@@ -1,16 +1,106 @@
+import re
 import sys
+import threading
+from datetime import datetime
+from pathlib import Path
 
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
+from PyQt6.QtCore import QDate, Qt
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QDialog, QMessageBox,
-    QTableView, QAbstractItemView
+    QTableView, QAbstractItemView, QMenu, QFileDialog, QInputDialog,
+    QWidget, QHBoxLayout, QComboBox, QLineEdit, QCheckBox, QDateEdit, QPushButton,
+    QVBoxLayout, QLabel, QTabWidget, QTableWidget, QTableWidgetItem
 )
 
+from activity_log import start_log_writer, stop_log_writers
+from backup import BackupManager
+from connection import close_all
 from database import DatabaseHandler
+from exporter import export_snapshot, export_tables
+from range_index import reload_range_index
+from search_suggest import SearchSuggester
+from table_model import BookTableModel, LogTableModel, size_columns
 from ui.Admin_Page import Ui_AdminWindow
 from ui.Confirmation import Ui_Dialog as Ui_ConfirmationDialog
 from ui.Form_Login_Admin import Ui_LoginWindow
 from ui.Katalog_Mainpage import Ui_MainWindow
+from ui.Log_Aktivitas import Ui_MainWindow as Ui_LogWindow
+from workers import (
+    AsyncDatabase, install_busy_indicator, run_with_progress, status_events, wait_for_workers
+)
+
+# Seconds between automatic snapshots; skipped when nothing was written
+BACKUP_INTERVAL = 6 * 60 * 60
+# Log rows older than this many days are moved to data/arsip_log at startup
+LOG_RETENTION_DAYS = 365
+
+
+def add_stats_button(window):
+    """Place a Statistik button left of Log_Aktivitas_Button, opening the dashboard"""
+    anchor = window.Log_Aktivitas_Button
+    button = QPushButton("Statistik", window.centralwidget)
+    button.setGeometry(anchor.x() - anchor.width() - 5, anchor.y(), anchor.width(), anchor.height())
+    button.clicked.connect(window.open_stats)
+    return button
+
+
+def add_diagnostics_button(window):
+    """Place a Diagnostik button left of Statistik_Button, opening the query diagnostics"""
+    anchor = window.Statistik_Button
+    button = QPushButton("Diagnostik", window.centralwidget)
+    button.setGeometry(anchor.x() - anchor.width() - 5, anchor.y(), anchor.width(), anchor.height())
+    button.clicked.connect(window.open_diagnostics)
+    return button
+
+
+def setup_search_filters(window):
+    """Refill Tahun_ComboBox and Kategori_ComboBox with the values present in BUKU"""
+    def fill(options):
+        if options is None:
+            return
+        window.Tahun_ComboBox.clear()
+        window.Tahun_ComboBox.addItem("Semua tahun", None)
+        for tahun in options["tahun"]:
+            window.Tahun_ComboBox.addItem(str(tahun), tahun)
+        window.Kategori_ComboBox.clear()
+        window.Kategori_ComboBox.addItem("Semua kategori", None)
+        for id_kategori, nama in options["kategori"]:
+            window.Kategori_ComboBox.addItem(nama, id_kategori)
+
+    window.async_db.submit(window.db.get_search_options, on_result=fill, channel="search_options")
+
+
+def search_filters(window):
+    """ID_Kategori and Tahun_Cetak chosen in the combo boxes, None for all"""
+    return window.Kategori_ComboBox.currentData(), window.Tahun_ComboBox.currentData()
+
+
+def is_number_search(text):
+    """Control numbers only (separated by spaces, commas or semicolons)"""
+    return re.fullmatch(r"[\d\s,;]+", text) is not None
+
+
+def search_text(window, text):
+    """Free-text mode: ranked search over book attributes, rak/category names and log details"""
+    window.async_db.submit(
+        window.db.search_books_text, text, *search_filters(window),
+        channel="search", on_result=window.show_search_result
+    )
+
+
+def setup_suggestions(window):
+    """Attach search-as-you-type to Form_Nomor_Kendali, showing a chosen book in Tabel_Hasil"""
+    def show(rows):
+        if rows:
+            window.Tabel_Hasil.setModel(BookTableModel(rows, window.Tabel_Hasil))
+            size_columns(window.Tabel_Hasil)
+
+    def choose(book_id):
+        window.async_db.submit(window.db.get_book_rows, [book_id], channel="search", on_result=show)
+
+    suggester = SearchSuggester(window, filters=lambda: search_filters(window))
+    suggester.book_chosen.connect(choose)
+    return suggester
 
 
 class MainWindow(QMainWindow, Ui_MainWindow):
@@ -18,60 +108,100 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         super().__init__()
         self.setupUi(self)
         self.db = DatabaseHandler()
+        self.async_db = AsyncDatabase(self)
+        install_busy_indicator(self, self.async_db)
 
         # Connect signals
         self.Search_Button.clicked.connect(self.search_book)
         self.Pindah_ke_Lantai_Button.clicked.connect(self.move_to_floor)
         self.Pinjam_ke_Luar_Ruangan_Button.clicked.connect(self.borrow_outside)
         self.Admin_Page_Button.clicked.connect(self.open_admin_login)
+        self.Log_Aktivitas_Button.clicked.connect(self.open_activity_log)
+        self.Statistik_Button = add_stats_button(self)
         self.Kembalikan_ke_Rak_dari_Lantai_Button.clicked.connect(self.move_from_floor_to_shelf)
         self.Kembalikan_ke_Rak_dari_Luar_Button.clicked.connect(self.return_from_borrowed)
+        status_events().status_changed.connect(self.on_status_changed)
 
         # Configure tables
         self.configure_table(self.Tabel_Hasil)
         self.configure_table(self.Tabel_di_Atas_Lantai)
         self.configure_table(self.Tabel_Dipinjam)
 
+        # Bulk actions on a whole rak
+        self.Tabel_Hasil.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.Tabel_Hasil.customContextMenuRequested.connect(self.show_result_menu)
+        self.Tabel_di_Atas_Lantai.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.Tabel_di_Atas_Lantai.customContextMenuRequested.connect(self.show_floor_menu)
+
         # Load initial data
+        setup_search_filters(self)
+        self.suggester = setup_suggestions(self)
         self.load_location_tables()
 
     def configure_table(self, table):
         table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
-        table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
         table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
 
     def load_location_tables(self):
-        books_on_floor = self.db.get_books_by_location("Di Lantai", full_attributes=True)
-        if books_on_floor is not None:
-            self.populate_table(self.Tabel_di_Atas_Lantai, books_on_floor)
-        books_outside = self.db.get_books_by_location("Dipinjam", full_attributes=True)
-        if books_outside is not None:
-            self.populate_table(self.Tabel_Dipinjam, books_outside)
+        for status in self.location_tables():
+            self.load_location_table(status)
+
+    def load_location_table(self, status):
+        """(Re)load one location table; a newer load supersedes a pending one"""
+        table, channel = self.location_tables()[status]
+        self.async_db.submit(
+            self.db.get_book_rows_by_location, status, channel=channel,
+            on_result=lambda rows: self.show_location_table(table, rows)
+        )
+
+    def location_tables(self):
+        return {
+            "Di Lantai": (self.Tabel_di_Atas_Lantai, "floor_table"),
+            "Dipinjam": (self.Tabel_Dipinjam, "borrowed_table"),
+        }
+
+    def on_status_changed(self, book_id, old_status, new_status, row):
+        """Move the changed row between location tables instead of reloading them"""
+        tables = self.location_tables()
+        for status in (old_status, new_status):
+            if status not in tables:
+                continue
+            table, channel = tables[status]
+            model = table.model()
+            if self.async_db.is_pending(channel):
+                # The pending load may have read before this change
+                self.load_location_table(status)
+            elif status == old_status:
+                if isinstance(model, BookTableModel) and model.remove_book(book_id):
+                    if model.total_rows() == 0:
+                        table.setModel(None)
+                else:
+                    self.load_location_table(status)
+            elif model is None:
+                self.set_table_model(table, BookTableModel([row], table))
+            elif isinstance(model, BookTableModel):
+                model.insert_book(row)
+            else:
+                self.load_location_table(status)
+
+    def show_location_table(self, table, rows):
+        if rows is None:
+            return
+        if not rows:
+            table.setModel(None)
+            return
+        self.set_table_model(table, BookTableModel(rows, table))
 
     def populate_table(self, table, books):
         if not books:
             table.setModel(None)
             return
-        model = QStandardItemModel(len(books), 10)
-        model.setHorizontalHeaderLabels([
-            "ID Buku", "Rak", "Kategori", "Tahun Cetak",
-            "Min No", "Max No", "Warna Sampul", "Subkategori",
-            "Status Kondisi", "Status Lokasi"
-        ])
-        for row, book in enumerate(books):
-            model.setItem(row, 0, QStandardItem(book.get("ID_Buku", "")))
-            model.setItem(row, 1, QStandardItem(book.get("Nama_Rak", "")))
-            model.setItem(row, 2, QStandardItem(book.get("Nama_Kategori", "")))
-            model.setItem(row, 3, QStandardItem(str(book.get("Tahun_Cetak", ""))))
-            model.setItem(row, 4, QStandardItem(str(book.get("No_Kendali_Min", ""))))
-            model.setItem(row, 5, QStandardItem(str(book.get("No_Kendali_Max", ""))))
-            model.setItem(row, 6, QStandardItem(book.get("Warna_Sampul", "")))
-            model.setItem(row, 7, QStandardItem(book.get("Subkategori", "")))
-            model.setItem(row, 8, QStandardItem(book.get("Status_Kondisi", "")))
-            model.setItem(row, 9, QStandardItem(book.get("Status_Lokasi", "")))
+        self.set_table_model(table, BookTableModel.from_books(books, table))
+
+    def set_table_model(self, table, model):
         table.setModel(model)
-        for column in range(10):
-            table.resizeColumnToContents(column)
+        size_columns(table)
 
     def get_selected_book_id(self, table):
         if table.model() is None:
@@ -84,77 +214,180 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             return None
         return table.model().index(rows[0].row(), 0).data()
 
+    def get_selected_book_ids(self, table):
+        if table.model() is None:
+            return []
+        sel = table.selectionModel()
+        if not sel or not sel.hasSelection():
+            return []
+        rows = sorted(index.row() for index in sel.selectedRows())
+        return [table.model().index(row, 0).data() for row in rows]
+
     def search_book(self):
-        nomor = self.Form_Nomor_Kendali.toPlainText().strip()
-        if not nomor:
+        self.suggester.hide()
+        text = self.Form_Nomor_Kendali.toPlainText().strip()
+        if not text:
             QMessageBox.warning(self, "Peringatan", "Masukkan nomor kendali arsip")
             return
-        try:
-            nomor = int(nomor)
-        except ValueError:
-            QMessageBox.warning(self, "Input Error", "Nomor kendali harus berupa angka")
+        if not is_number_search(text):
+            search_text(self, text)
+            return
+        numbers = [int(part) for part in re.split(r"[\s,;]+", text) if part]
+        if len(numbers) > 1:
+            self.search_many_books(numbers)
             return
-        book = self.db.search_book(nomor)
-        if book:
-            self.populate_table(self.Tabel_Hasil, [book])
+        self.async_db.submit(
+            self.db.search_book_matches, numbers[0], *search_filters(self),
+            channel="search", on_result=self.show_search_result
+        )
+
+    def show_search_result(self, books):
+        if books:
+            self.populate_table(self.Tabel_Hasil, books)
         else:
             QMessageBox.information(self, "Hasil Pencarian", "Buku tidak ditemukan")
             self.Tabel_Hasil.setModel(None)
 
+    def search_many_books(self, numbers):
+        """Multi-number mode: resolve every number in a single query"""
+        self.async_db.submit(
+            self.db.search_books, numbers, *search_filters(self), channel="search",
+            on_result=lambda found: self.show_many_results(numbers, found)
+        )
+
+    def show_many_results(self, numbers, found):
+        if found is None:
+            return
+        books = list({book["ID_Buku"]: book
+                      for matches in found.values() for book in matches}.values())
+        missing = sorted(set(numbers) - set(found))
+        if books:
+            self.populate_table(self.Tabel_Hasil, books)
+        else:
+            self.Tabel_Hasil.setModel(None)
+        if missing:
+            QMessageBox.information(
+                self, "Hasil Pencarian",
+                f"{len(books)} buku ditemukan. Nomor tidak ditemukan: "
+                + ", ".join(str(nomor) for nomor in missing)
+            )
+
+    def transition_and_fetch(self, book_ids, new_status, action_type):
+        """Runs on the write worker: change and log all statuses, return the changes"""
+        changed = self.db.transition_books(book_ids, new_status, 2, action_type)
+        if not changed:
+            return changed
+        rows = {row[0]: row for row in self.db.get_book_rows(book_id for book_id, _ in changed)}
+        return [(book_id, old_status, rows.get(book_id)) for book_id, old_status in changed]
+
+    def change_status(self, book_ids, new_status, action_type, message, clear_search=False):
+        def done(changes):
+            if changes is None:
+                QMessageBox.warning(self, "Gagal", "Status buku gagal diubah")
+                return
+            if len(changes) > BookTableModel.FETCH_BATCH:
+                self.load_location_tables()
+            else:
+                for book_id, old_status, row in changes:
+                    status_events().status_changed.emit(book_id, old_status, new_status, row)
+            if clear_search:
+                self.Tabel_Hasil.setModel(None)
+                self.Form_Nomor_Kendali.clear()
+            if not changes:
+                QMessageBox.information(self, "Info", f"Semua buku yang dipilih sudah berstatus {new_status}")
+            elif len(changes) == 1:
+                QMessageBox.information(self, "Berhasil", message)
+            else:
+                QMessageBox.information(self, "Berhasil", f"{message} ({len(changes)} buku)")
+
+        self.async_db.submit(
+            self.transition_and_fetch, book_ids, new_status, action_type,
+            write=True, on_result=done
+        )
+
     def move_to_floor(self):
-        book_id = self.get_selected_book_id(self.Tabel_Hasil)
-        if not book_id:
+        book_ids = self.get_selected_book_ids(self.Tabel_Hasil)
+        if not book_ids:
             QMessageBox.warning(self, "Peringatan", "Pilih buku di Tabel Hasil terlebih dahulu")
             return
-        if self.db.update_location_status(book_id, "Di Lantai"):
-            self.db.log_activity(2, book_id, "Pinjam", "Status diubah ke Di Lantai")
-            self.load_location_tables()
-            self.Tabel_Hasil.setModel(None)
-            self.Form_Nomor_Kendali.clear()
-            QMessageBox.information(self, "Berhasil", "Buku berhasil dipindahkan ke lantai")
+        self.change_status(book_ids, "Di Lantai", "Pinjam",
+                           "Buku berhasil dipindahkan ke lantai", clear_search=True)
 
     def move_from_floor_to_shelf(self):
-        book_id = self.get_selected_book_id(self.Tabel_di_Atas_Lantai)
-        if not book_id:
+        book_ids = self.get_selected_book_ids(self.Tabel_di_Atas_Lantai)
+        if not book_ids:
             QMessageBox.warning(self, "Peringatan", "Pilih buku di Tabel di Atas Lantai terlebih dahulu")
             return
-        if self.db.update_location_status(book_id, "Di Rak"):
-            self.db.log_activity(2, book_id, "Kembalikan", "Status diubah ke Di Rak")
-            self.load_location_tables()
-            QMessageBox.information(self, "Berhasil", "Buku berhasil dikembalikan ke rak")
+        self.change_status(book_ids, "Di Rak", "Kembalikan", "Buku berhasil dikembalikan ke rak")
 
     def borrow_outside(self):
-        book_id = self.get_selected_book_id(self.Tabel_Hasil)
-        if not book_id:
+        book_ids = self.get_selected_book_ids(self.Tabel_Hasil)
+        if not book_ids:
             QMessageBox.warning(self, "Peringatan", "Pilih buku di Tabel Hasil terlebih dahulu")
             return
-        if self.db.update_location_status(book_id, "Dipinjam"):
-            self.db.log_activity(2, book_id, "Pinjam", "Status diubah ke Dipinjam")
-            self.load_location_tables()
-            self.Tabel_Hasil.setModel(None)
-            self.Form_Nomor_Kendali.clear()
-            QMessageBox.information(self, "Berhasil", "Buku berhasil dipinjam ke luar ruangan")
+        self.change_status(book_ids, "Dipinjam", "Pinjam",
+                           "Buku berhasil dipinjam ke luar ruangan", clear_search=True)
 
     def return_from_borrowed(self):
-        book_id = self.get_selected_book_id(self.Tabel_Dipinjam)
-        if not book_id:
+        book_ids = self.get_selected_book_ids(self.Tabel_Dipinjam)
+        if not book_ids:
             QMessageBox.warning(self, "Peringatan", "Pilih buku di Tabel Dipinjam terlebih dahulu")
             return
-        if self.db.update_location_status(book_id, "Di Rak"):
-            self.db.log_activity(2, book_id, "Kembalikan", "Status diubah ke Di Rak")
-            self.load_location_tables()
-            QMessageBox.information(self, "Berhasil", "Buku berhasil dikembalikan ke rak")
+        self.change_status(book_ids, "Di Rak", "Kembalikan", "Buku berhasil dikembalikan ke rak")
+
+    def show_result_menu(self, pos):
+        book_id = self.get_selected_book_id(self.Tabel_Hasil)
+        if not book_id:
+            return
+        menu = QMenu(self)
+        menu.addAction("Pindahkan seluruh rak ke lantai",
+                       lambda: self.move_whole_rak(book_id, "Di Rak", "Di Lantai", "Pinjam",
+                                                   "Buku berhasil dipindahkan ke lantai"))
+        menu.exec(self.Tabel_Hasil.viewport().mapToGlobal(pos))
+
+    def show_floor_menu(self, pos):
+        book_id = self.get_selected_book_id(self.Tabel_di_Atas_Lantai)
+        if not book_id:
+            return
+        menu = QMenu(self)
+        menu.addAction("Kembalikan seluruh rak dari lantai",
+                       lambda: self.move_whole_rak(book_id, "Di Lantai", "Di Rak", "Kembalikan",
+                                                   "Buku berhasil dikembalikan ke rak"))
+        menu.exec(self.Tabel_di_Atas_Lantai.viewport().mapToGlobal(pos))
+
+    def move_whole_rak(self, book_id, from_status, new_status, action_type, message):
+        """Bulk action: move every book of the selected book's rak in one transaction"""
+        def start(book_ids):
+            if not book_ids:
+                QMessageBox.information(self, "Info", f"Tidak ada buku berstatus {from_status} di rak ini")
+                return
+            self.change_status(book_ids, new_status, action_type, message,
+                               clear_search=new_status != "Di Rak")
+
+        self.async_db.submit(
+            self.db.get_rak_book_ids, book_id, from_status, on_result=start
+        )
 
     def open_admin_login(self):
         self.login_window = LoginWindow(self)
         self.login_window.show()
 
+    def open_activity_log(self):
+        self.log_window = LogWindow(self)
+        self.log_window.show()
+
+    def open_stats(self):
+        self.stats_dialog = StatsDialog(self)
+        self.stats_dialog.show()
+
 
 class LoginWindow(QMainWindow, Ui_LoginWindow):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setupUi(self)
         self.db = DatabaseHandler()
+        self.async_db = AsyncDatabase(self)
+        install_busy_indicator(self, self.async_db)
         self.setWindowTitle("Login Admin")
 
         # Configure table for search results
@@ -166,6 +399,9 @@ class LoginWindow(QMainWindow, Ui_LoginWindow):
         self.Pinjam_ke_Luar_Ruangan_Button.clicked.connect(self.borrow_outside)
         self.Login_Button.clicked.connect(self.authenticate)
         self.Staff_Page_Button.clicked.connect(self.open_staff_page)
+        self.Log_Aktivitas_Button.clicked.connect(self.open_activity_log)
+        setup_search_filters(self)
+        self.suggester = setup_suggestions(self)
 
     def configure_table(self, table):
         """Configure table settings"""
@@ -187,58 +423,61 @@ class LoginWindow(QMainWindow, Ui_LoginWindow):
 
     def search_book(self):
         """Search book by control number"""
+        self.suggester.hide()
         nomor = self.Form_Nomor_Kendali.toPlainText().strip()
         if not nomor:
             QMessageBox.warning(self, "Peringatan", "Masukkan nomor kendali arsip")
             return
-        try:
-            nomor = int(nomor)
-        except ValueError:
-            QMessageBox.warning(self, "Input Error", "Nomor kendali harus berupa angka")
+        if not nomor.isdigit():
+            search_text(self, nomor)
             return
-        book = self.db.search_book(nomor)
-        if book:
-            # Create model with headers
-            model = QStandardItemModel(1, 10)
-            model.setHorizontalHeaderLabels([
-                "ID Buku", "Rak", "Kategori", "Tahun Cetak",
-                "Min No", "Max No", "Warna Sampul", "Subkategori",
-                "Status Kondisi", "Status Lokasi"
-            ])
-
-            # Populate model with data
-            model.setItem(0, 0, QStandardItem(book.get("ID_Buku", "")))
-            model.setItem(0, 1, QStandardItem(book.get("Nama_Rak", "")))
-            model.setItem(0, 2, QStandardItem(book.get("Nama_Kategori", "")))
-            model.setItem(0, 3, QStandardItem(str(book.get("Tahun_Cetak", ""))))
-            model.setItem(0, 4, QStandardItem(str(book.get("No_Kendali_Min", ""))))
-            model.setItem(0, 5, QStandardItem(str(book.get("No_Kendali_Max", ""))))
-            model.setItem(0, 6, QStandardItem(book.get("Warna_Sampul", "")))
-            model.setItem(0, 7, QStandardItem(book.get("Subkategori", "")))
-            model.setItem(0, 8, QStandardItem(book.get("Status_Kondisi", "")))
-            model.setItem(0, 9, QStandardItem(book.get("Status_Lokasi", "")))
-
-            # Set model to table
-            self.Tabel_Hasil.setModel(model)
-
-            # Resize columns to content
-            for column in range(10):
-                self.Tabel_Hasil.resizeColumnToContents(column)
+        self.async_db.submit(
+            self.db.search_book_matches, int(nomor), *search_filters(self),
+            channel="search", on_result=self.show_search_result
+        )
+
+    def show_search_result(self, books):
+        """Show the search results delivered by the background worker"""
+        if books:
+            self.Tabel_Hasil.setModel(BookTableModel.from_books(books, self.Tabel_Hasil))
+            size_columns(self.Tabel_Hasil)
         else:
             QMessageBox.information(self, "Hasil Pencarian", "Buku tidak ditemukan")
             self.Tabel_Hasil.setModel(None)
 
+    def update_and_log(self, book_id, new_status, action_type):
+        """Runs on the write worker: change and log the status, return the change"""
+        old_status = self.db.transition_book(book_id, new_status, 2, action_type)
+        if not old_status:
+            return old_status
+        return old_status, self.db.get_book_row(book_id)
+
+    def change_status(self, book_id, new_status, action_type, message):
+        """Apply a status change in the background and report the result"""
+        def done(change):
+            if change is False:
+                QMessageBox.information(self, "Info", f"Buku sudah berstatus {new_status}")
+                return
+            if not change:
+                return
+            old_status, row = change
+            status_events().status_changed.emit(book_id, old_status, new_status, row)
+            self.Tabel_Hasil.setModel(None)
+            self.Form_Nomor_Kendali.clear()
+            QMessageBox.information(self, "Berhasil", message)
+
+        self.async_db.submit(
+            self.update_and_log, book_id, new_status, action_type,
+            write=True, on_result=done
+        )
+
     def move_to_floor(self):
         """Move selected book to floor status"""
         book_id = self.get_selected_book_id(self.Tabel_Hasil)
         if not book_id:
             QMessageBox.warning(self, "Peringatan", "Pilih buku di Tabel Hasil terlebih dahulu")
             return
-        if self.db.update_location_status(book_id, "Di Lantai"):
-            self.db.log_activity(2, book_id, "Pinjam", "Status diubah ke Di Lantai")
-            self.Tabel_Hasil.setModel(None)
-            self.Form_Nomor_Kendali.clear()
-            QMessageBox.information(self, "Berhasil", "Buku berhasil dipindahkan ke lantai")
+        self.change_status(book_id, "Di Lantai", "Pinjam", "Buku berhasil dipindahkan ke lantai")
 
     def borrow_outside(self):
         """Borrow selected book outside"""
@@ -246,11 +485,7 @@ class LoginWindow(QMainWindow, Ui_LoginWindow):
         if not book_id:
             QMessageBox.warning(self, "Peringatan", "Pilih buku di Tabel Hasil terlebih dahulu")
             return
-        if self.db.update_location_status(book_id, "Dipinjam"):
-            self.db.log_activity(2, book_id, "Pinjam", "Status diubah ke Dipinjam")
-            self.Tabel_Hasil.setModel(None)
-            self.Form_Nomor_Kendali.clear()
-            QMessageBox.information(self, "Berhasil", "Buku berhasil dipinjam ke luar ruangan")
+        self.change_status(book_id, "Dipinjam", "Pinjam", "Buku berhasil dipinjam ke luar ruangan")
 
     def authenticate(self):
         """Authenticate admin credentials"""
@@ -272,6 +507,10 @@ class LoginWindow(QMainWindow, Ui_LoginWindow):
         else:
             QMessageBox.warning(self, "Login Gagal", "Username atau password salah")
 
+    def open_activity_log(self):
+        self.log_window = LogWindow(self)
+        self.log_window.show()
+
     def open_staff_page(self):
         """Open staff main window"""
         self.main_window = MainWindow()
@@ -285,15 +524,399 @@ class AdminPanel(QMainWindow, Ui_AdminWindow):
         self.setupUi(self)
         self.user = user
         self.db = DatabaseHandler()
+        self.async_db = AsyncDatabase(self)
+        install_busy_indicator(self, self.async_db)
         self.setWindowTitle("Panel Admin")
 
-        # Add admin functionality here
-        # For example:
-        # self.btnAdd.clicked.connect(self.add_book)
-        # self.btnEdit.clicked.connect(self.edit_book)
-        # self.btnDelete.clicked.connect(self.delete_book)
-        # self.btnImport.clicked.connect(self.import_data)
-        # self.btnExport.clicked.connect(self.export_data)
+        self.Tabel_Hasil.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.Tabel_Hasil.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        setup_search_filters(self)
+        self.suggester = setup_suggestions(self)
+
+        # Connect signals
+        self.Search_Button.clicked.connect(self.search_book)
+        self.Impor_Button.clicked.connect(self.import_backup)
+        self.Expor_Button.clicked.connect(self.export_backup)
+        self.Log_Aktivitas_Button.clicked.connect(self.open_activity_log)
+        self.Statistik_Button = add_stats_button(self)
+        self.Diagnostik_Button = add_diagnostics_button(self)
+
+    def open_activity_log(self):
+        self.log_window = LogWindow(self)
+        self.log_window.show()
+
+    def open_stats(self):
+        self.stats_dialog = StatsDialog(self)
+        self.stats_dialog.show()
+
+    def open_diagnostics(self):
+        self.diagnostics_dialog = DiagnosticsDialog(self)
+        self.diagnostics_dialog.show()
+
+    def search_book(self):
+        """Search by control number or free text within the chosen category and year"""
+        self.suggester.hide()
+        nomor = self.Form_Nomor_Kendali.toPlainText().strip()
+        if not nomor:
+            return
+        if not nomor.isdigit():
+            search_text(self, nomor)
+            return
+        self.async_db.submit(
+            self.db.search_book_matches, int(nomor), *search_filters(self),
+            channel="search", on_result=self.show_search_result
+        )
+
+    def show_search_result(self, books):
+        if books:
+            self.Tabel_Hasil.setModel(BookTableModel.from_books(books, self.Tabel_Hasil))
+            size_columns(self.Tabel_Hasil)
+        else:
+            QMessageBox.information(self, "Hasil Pencarian", "Buku tidak ditemukan")
+            self.Tabel_Hasil.setModel(None)
+
+    def import_backup(self):
+        """Import BUKU rows from a CSV or Excel file, or restore a snapshot"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Impor Backup", "",
+            "Data Buku (*.csv *.xlsx);;Snapshot SQLite (*.sqlite)"
+        )
+        if not path:
+            return
+        if path.lower().endswith(".sqlite"):
+            self.restore_snapshot(path)
+            return
+        # Buku yang sudah ada ditolak kecuali admin memilih memperbaruinya
+        answer = QMessageBox.question(
+            self, "Impor Data Buku",
+            "Perbarui buku yang ID_Buku-nya sudah ada?\n\n"
+            "Ya: data buku tersebut diganti dan setiap perubahan dicatat di log.\n"
+            "Tidak: baris tersebut ditolak dan dicatat di laporan kesalahan.",
+            defaultButton=QMessageBox.StandardButton.No
+        )
+        update_existing = answer == QMessageBox.StandardButton.Yes
+        # Imported here so pandas is only loaded when an import is run
+        from importer import import_books
+        run_with_progress(
+            self, "Mengimpor data buku...", import_books, self.db, path,
+            update_existing=update_existing, user_id=self.user["ID_Pengguna"],
+            on_result=self.show_import_result
+        )
+
+    def restore_snapshot(self, path):
+        """Replace the live database with a snapshot after confirmation"""
+        answer = QMessageBox.question(
+            self, "Pulihkan Database",
+            f"Seluruh data akan diganti dengan isi snapshot:\n{path}\n\n"
+            "Snapshot data saat ini dibuat terlebih dahulu. Lanjutkan?"
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        run_with_progress(
+            self, "Memulihkan database...", BackupManager(self.db).restore, path,
+            on_result=lambda _: self.show_restore_result(path)
+        )
+
+    def show_restore_result(self, path):
+        QMessageBox.information(self, "Pemulihan Selesai", f"Database dipulihkan dari {path}")
+        setup_search_filters(self)
+        self.async_db.submit(reload_range_index, self.db, channel="range_index")
+
+    def show_import_result(self, result):
+        message = f"{result.imported} dari {result.total} baris berhasil diimpor."
+        if result.updated:
+            message += f"\n{result.updated} buku yang sudah ada diperbarui."
+        if result.rejected:
+            message += f"\n{len(result.rejected)} baris ditolak karena data tidak valid atau ID_Buku sudah ada."
+        if result.overlaps:
+            message += f"\n{len(result.overlaps)} baris memiliki rentang nomor kendali yang tumpang tindih."
+        if result.report_path:
+            message += f"\nLaporan kesalahan: {result.report_path}"
+        QMessageBox.information(self, "Impor Selesai", message)
+        setup_search_filters(self)
+        self.async_db.submit(reload_range_index, self.db, channel="range_index")
+
+    def export_backup(self):
+        """Export the catalog and activity log on a worker thread"""
+        formats = {
+            "CSV (satu file per tabel)": "csv",
+            "JSONL terkompresi (gzip)": "jsonl.gz",
+            "Snapshot SQLite": "sqlite",
+        }
+        choice, ok = QInputDialog.getItem(
+            self, "Ekspor Backup", "Format ekspor:", list(formats), 0, False
+        )
+        if not ok:
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Pilih folder tujuan ekspor")
+        if not folder:
+            return
+        fmt = formats[choice]
+        if fmt == "sqlite":
+            name = datetime.now().strftime("arsip-%Y%m%d-%H%M%S.sqlite")
+            run_with_progress(
+                self, "Membuat snapshot database...", export_snapshot,
+                self.db, Path(folder) / name,
+                on_result=lambda path: QMessageBox.information(
+                    self, "Ekspor Selesai", f"Snapshot disimpan di {path}")
+            )
+        else:
+            run_with_progress(
+                self, "Mengekspor data...", export_tables, self.db, folder, fmt,
+                on_result=lambda manifest: self.show_export_result(folder, manifest)
+            )
+
+    def show_export_result(self, folder, manifest):
+        counts = ", ".join(
+            f"{table}: {state['rows']}" for table, state in manifest["tables"].items()
+        )
+        QMessageBox.information(self, "Ekspor Selesai", f"Data diekspor ke {folder}\n{counts}")
+
+
+class LogWindow(QMainWindow, Ui_LogWindow):
+    """Activity log viewer, newest entries first, loaded page by page on scroll"""
+
+    ACTIONS = ("Tambah", "Edit", "Hapus", "Pinjam", "Kembalikan")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setupUi(self)
+        self.db = DatabaseHandler()
+        self.async_db = AsyncDatabase(self)
+        install_busy_indicator(self, self.async_db)
+        self.setWindowTitle("Log Aktivitas")
+
+        self.setup_filters()
+        self.Admin_Page_Button.clicked.connect(self.open_admin_login)
+
+        table = self.Tabel_Log_Aktivitas
+        table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        self.async_db.submit(self.db.get_users, on_result=self.show_users)
+        self.apply_filters()
+
+    def setup_filters(self):
+        """Add the filter bar above the log table"""
+        table = self.Tabel_Log_Aktivitas
+        bar = QWidget(self.centralwidget)
+        bar.setGeometry(table.x(), table.y(), table.width(), 30)
+        table.setGeometry(table.x(), table.y() + 35, table.width(), table.height() - 35)
+
+        self.Filter_Pengguna = QComboBox()
+        self.Filter_Pengguna.addItem("Semua pengguna", None)
+        self.Filter_Buku = QLineEdit()
+        self.Filter_Buku.setPlaceholderText("ID Buku")
+        self.Filter_Teks = QLineEdit()
+        self.Filter_Teks.setPlaceholderText("Cari detail")
+        self.Filter_Aksi = QComboBox()
+        self.Filter_Aksi.addItem("Semua aksi", None)
+        for action in self.ACTIONS:
+            self.Filter_Aksi.addItem(action, action)
+        self.Filter_Tanggal = QCheckBox("Tanggal")
+        today = QDate.currentDate()
+        self.Filter_Dari = QDateEdit(today.addMonths(-1))
+        self.Filter_Sampai = QDateEdit(today)
+        for edit in (self.Filter_Dari, self.Filter_Sampai):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd")
+        self.Terapkan_Button = QPushButton("Terapkan")
+
+        layout = QHBoxLayout(bar)
+        layout.setContentsMargins(0, 0, 0, 0)
+        for widget in (self.Filter_Pengguna, self.Filter_Buku, self.Filter_Teks, self.Filter_Aksi,
+                       self.Filter_Tanggal, self.Filter_Dari, self.Filter_Sampai,
+                       self.Terapkan_Button):
+            layout.addWidget(widget)
+
+        self.Terapkan_Button.clicked.connect(self.apply_filters)
+        self.Filter_Buku.returnPressed.connect(self.apply_filters)
+        self.Filter_Teks.returnPressed.connect(self.apply_filters)
+
+    def show_users(self, users):
+        for user in users or []:
+            self.Filter_Pengguna.addItem(user["Username"], user["ID_Pengguna"])
+
+    def current_filters(self):
+        filters = {
+            "user_id": self.Filter_Pengguna.currentData(),
+            "book_id": self.Filter_Buku.text().strip() or None,
+            "action": self.Filter_Aksi.currentData(),
+            "text": self.Filter_Teks.text().strip() or None,
+        }
+        if self.Filter_Tanggal.isChecked():
+            filters["date_from"] = self.Filter_Dari.date().toString("yyyy-MM-dd")
+            filters["date_to"] = self.Filter_Sampai.date().toString("yyyy-MM-dd")
+        return filters
+
+    def apply_filters(self):
+        """Start the log over from the newest entry with the current filters"""
+        filters = self.current_filters()
+
+        def load_page(after, on_result):
+            self.async_db.submit(
+                self.db.get_log_page, filters, after,
+                on_result=on_result, channel="log_page"
+            )
+
+        previous = self.Tabel_Log_Aktivitas.model()
+        model = LogTableModel(load_page, self.Tabel_Log_Aktivitas)
+        self.Tabel_Log_Aktivitas.setModel(model)
+        if previous is not None:
+            previous.deleteLater()
+        model.rowsInserted.connect(self.on_first_page)
+        model.fetchMore()
+
+    def on_first_page(self):
+        model = self.sender()
+        model.rowsInserted.disconnect(self.on_first_page)
+        size_columns(self.Tabel_Log_Aktivitas)
+
+    def open_admin_login(self):
+        self.login_window = LoginWindow(self)
+        self.login_window.show()
+
+
+class StatsDialog(QDialog):
+    """Dashboard of book counts per location status, read from the counter tables"""
+
+    STATUS_COLUMNS = [("Di_Rak", "Di Rak"), ("Di_Lantai", "Di Lantai"),
+                      ("Dipinjam", "Dipinjam"), ("Total", "Total")]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Statistik Katalog")
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.resize(640, 480)
+        self.db = DatabaseHandler()
+        self.async_db = AsyncDatabase(self)
+
+        self.Label_Total = QLabel("Memuat data...")
+        self.Label_Cache = QLabel()
+        self.Tabel_Kategori = self.make_table(["Kategori"])
+        self.Tabel_Tahun = self.make_table(["Kategori", "Tahun Cetak"])
+        self.Tabel_Rak = self.make_table(["Rak"])
+        tabs = QTabWidget()
+        tabs.addTab(self.Tabel_Kategori, "Per Kategori")
+        tabs.addTab(self.Tabel_Tahun, "Per Tahun")
+        tabs.addTab(self.Tabel_Rak, "Per Rak")
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.Label_Total)
+        layout.addWidget(tabs)
+        layout.addWidget(self.Label_Cache)
+
+        status_events().status_changed.connect(self.load_stats)
+        self.load_stats()
+
+    def make_table(self, key_headers):
+        table = QTableWidget(0, len(key_headers) + len(self.STATUS_COLUMNS))
+        table.setHorizontalHeaderLabels(key_headers + [title for _, title in self.STATUS_COLUMNS])
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    def load_stats(self, *_):
+        self.async_db.submit(self.db.get_stats, on_result=self.show_stats, channel="stats")
+
+    def show_stats(self, stats):
+        if stats is None:
+            self.Label_Total.setText("Statistik tidak dapat dimuat.")
+            return
+        total = stats["total"]
+        self.Label_Total.setText(
+            f"Total {total['Total'] or 0} buku: {total['Di_Rak'] or 0} di rak, "
+            f"{total['Di_Lantai'] or 0} di lantai, {total['Dipinjam'] or 0} dipinjam"
+        )
+        self.fill_table(self.Tabel_Kategori, stats["kategori"],
+                        lambda row: [row["Nama_Kategori"] or row["ID_Kategori"]])
+        self.fill_table(self.Tabel_Tahun, stats["tahun"],
+                        lambda row: [row["Nama_Kategori"] or row["ID_Kategori"],
+                                     row["Tahun_Cetak"] or "-"])
+        self.fill_table(self.Tabel_Rak, stats["rak"],
+                        lambda row: [row["Nama_Rak"] or row["ID_Rak"]])
+        cache = self.db.cache_stats()
+        self.Label_Cache.setText(
+            f"Cache query: {cache['hits']} hit, {cache['misses']} miss "
+            f"({cache['hit_rate']:.0%}), {cache['entries']} entri, {cache['rows']} baris"
+        )
+
+    def fill_table(self, table, rows, keys):
+        table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            values = keys(row) + [row[column] for column, _ in self.STATUS_COLUMNS]
+            for c, value in enumerate(values):
+                table.setItem(r, c, QTableWidgetItem(str(value)))
+        table.resizeColumnsToContents()
+
+
+class DiagnosticsDialog(QDialog):
+    """Query latency percentiles, slow statements with their plans and cache counters"""
+
+    QUERY_COLUMNS = [("name", "Query"), ("count", "Jumlah"), ("p50_ms", "p50 (ms)"),
+                     ("p95_ms", "p95 (ms)"), ("p99_ms", "p99 (ms)"), ("max_ms", "Maks (ms)"),
+                     ("mean_ms", "Rata-rata (ms)"), ("rows", "Baris")]
+    SLOW_COLUMNS = [("time", "Waktu"), ("name", "Query"), ("ms", "Durasi (ms)"),
+                    ("sql", "SQL"), ("plan", "Rencana")]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostik Query")
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.resize(900, 560)
+        self.db = DatabaseHandler()
+
+        self.Label_Ringkasan = QLabel()
+        self.Tabel_Query = self.make_table(self.QUERY_COLUMNS)
+        self.Tabel_Lambat = self.make_table(self.SLOW_COLUMNS)
+        tabs = QTabWidget()
+        tabs.addTab(self.Tabel_Query, "Latensi")
+        tabs.addTab(self.Tabel_Lambat, "Query Lambat")
+        refresh = QPushButton("Muat Ulang")
+        refresh.clicked.connect(self.load)
+        reset = QPushButton("Reset")
+        reset.clicked.connect(self.reset)
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(refresh)
+        buttons.addWidget(reset)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.Label_Ringkasan)
+        layout.addWidget(tabs)
+        layout.addLayout(buttons)
+        self.load()
+
+    def make_table(self, columns):
+        table = QTableWidget(0, len(columns))
+        table.setHorizontalHeaderLabels([title for _, title in columns])
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    def load(self):
+        stats = self.db.query_stats()
+        cache = stats["cache"]
+        self.Label_Ringkasan.setText(
+            f"Sejak {stats['since']}; query lambat: >= {stats['slow_ms']} ms. "
+            f"Cache: {cache['hits']} hit, {cache['misses']} miss ({cache['hit_rate']:.0%}), "
+            f"{cache['entries']} entri"
+        )
+        self.fill_table(self.Tabel_Query, self.QUERY_COLUMNS, stats["queries"])
+        slow = [dict(entry, plan="\n".join(entry["plan"])) for entry in stats["slow"]]
+        self.fill_table(self.Tabel_Lambat, self.SLOW_COLUMNS, slow)
+
+    def reset(self):
+        self.db.reset_query_stats()
+        self.load()
+
+    def fill_table(self, table, columns, rows):
+        table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (key, _) in enumerate(columns):
+                value = row[key]
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                table.setItem(r, c, QTableWidgetItem(text))
+        table.resizeColumnsToContents()
+        table.resizeRowsToContents()
 
 
 class ConfirmationDialog(QDialog, Ui_ConfirmationDialog):
@@ -305,6 +928,16 @@ class ConfirmationDialog(QDialog, Ui_ConfirmationDialog):
 
 def main():
     app = QApplication(sys.argv)
+    db = DatabaseHandler()
+    start_log_writer(db)
+    threading.Thread(target=db.archive_logs, args=(LOG_RETENTION_DAYS,), daemon=True).start()
+    backups = BackupManager(db)
+    backups.start_schedule(BACKUP_INTERVAL)
+    app.aboutToQuit.connect(backups.stop_schedule)
+    # Workers may still queue log rows, so they finish before the writers stop
+    app.aboutToQuit.connect(wait_for_workers)
+    app.aboutToQuit.connect(stop_log_writers)
+    app.aboutToQuit.connect(close_all)
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,134 @@
+# query_cache.py
+import threading
+from collections import OrderedDict
+
+
+class QueryCache:
+    """LRU cache of read query results, invalidated per table
+
+    Every entry is tagged with the tables its query reads. Writers call
+    invalidate() with the tables they changed, which drops the tagged
+    entries and bumps those tables' generation: a load that started before
+    the write then finds the generation changed and is not stored, so a
+    stale result never enters the cache. Size is bounded both by entry
+    count and by the total number of cached rows.
+
+    Writes from other processes never reach invalidate(), so each lookup
+    first calls version() (the pool's data_version) and clears the whole
+    cache when it changed.
+    """
+
+    def __init__(self, max_entries=256, max_rows=20000, version=None):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._version = version
+        self._seen_version = version() if version is not None else None
+        self._entries = OrderedDict()  # key -> (tables, result, rows)
+        self._generations = {}
+        self._epoch = 0
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, tables, load):
+        """Return the cached result for key, or load(), cache and return it
+
+        Results of None (errors) are never cached.
+        """
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generations = self._generation_of(tables)
+
+        result = load()
+        if result is None:
+            return None
+        rows = len(result) if isinstance(result, (list, tuple)) else 1
+        if rows > self.max_rows // 4:
+            return result
+
+        # A commit from another process during load() is caught here
+        self._check_version()
+        with self._lock:
+            if generations != self._generation_of(tables):
+                return result
+            if key not in self._entries:
+                self._entries[key] = (frozenset(tables), result, rows)
+                self._rows += rows
+                self._evict()
+        return result
+
+    def _check_version(self):
+        if self._version is None:
+            return
+        version = self._version()
+        with self._lock:
+            if version == self._seen_version:
+                return
+            self._seen_version = version
+        self.clear()
+
+    def _generation_of(self, tables):
+        return self._epoch, [self._generations.get(table, 0) for table in tables]
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._rows > self.max_rows):
+            _, (_, _, rows) = self._entries.popitem(last=False)
+            self._rows -= rows
+            self.evictions += 1
+
+    def invalidate(self, *tables):
+        """Drop every entry that reads any of the given tables"""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, (tags, _, _) in self._entries.items()
+                     if not tags.isdisjoint(tables)]
+            for key in stale:
+                self._rows -= self._entries.pop(key)[2]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop everything, e.g. after an import or restore"""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "rows": self._rows,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def cache_for(pool):
+    """Return the query cache shared by every handler of a pool"""
+    with _caches_lock:
+        cache = _caches.get(pool)
+        if cache is None:
+            cache = QueryCache(version=pool.data_version)
+            _caches[pool] = cache
+        return cache
@@ -0,0 +1,178 @@
+# query_stats.py
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+
+# Upper bounds in milliseconds of the latency buckets; the last one is open
+BUCKET_BOUNDS_MS = (
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+    float("inf"),
+)
+
+
+class Histogram:
+    """Latency counts per bucket plus totals for one named query"""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "rows")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKET_BOUNDS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def add(self, ms, rows):
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls,
+        capped at the slowest call seen"""
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_MS, self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class QueryStats:
+    """Per-query latency histograms and a log of slow statements
+
+    DatabaseHandler methods are timed as a whole under their own name;
+    statements run outside them are timed under execute_query, fetch_rows
+    and so on. A statement slower than slow_ms is kept, with its EXPLAIN
+    QUERY PLAN and the name of the method that ran it, in a bounded log.
+    Recording is a bisect and a few additions under a lock, so it stays on
+    in production.
+    """
+
+    def __init__(self, slow_ms=100, max_slow=50):
+        self.slow_ms = slow_ms
+        self._histograms = {}
+        self._slow = deque(maxlen=max_slow)
+        self._lock = threading.Lock()
+        self._since = datetime.now()
+
+    def record(self, name, ms, rows=0):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(ms, rows)
+
+    def is_slow(self, ms):
+        return ms >= self.slow_ms
+
+    def record_slow(self, name, sql, ms, plan):
+        """Keep one slow statement; parameters are not stored"""
+        with self._lock:
+            self._slow.appendleft({
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "name": name,
+                "ms": ms,
+                "sql": " ".join(sql.split()),
+                "plan": plan,
+            })
+
+    def snapshot(self):
+        """Per-name counts, p50/p95/p99/max/mean in ms and rows, slowest p95 first"""
+        with self._lock:
+            result = [
+                {
+                    "name": name,
+                    "count": h.count,
+                    "p50_ms": h.percentile(0.50),
+                    "p95_ms": h.percentile(0.95),
+                    "p99_ms": h.percentile(0.99),
+                    "max_ms": h.max_ms,
+                    "mean_ms": h.total_ms / h.count,
+                    "rows": h.rows,
+                }
+                for name, h in self._histograms.items()
+            ]
+        return sorted(result, key=lambda entry: entry["p95_ms"], reverse=True)
+
+    def slow_queries(self):
+        """Slow statements, newest first"""
+        with self._lock:
+            return list(self._slow)
+
+    def since(self):
+        return self._since
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._slow.clear()
+            self._since = datetime.now()
+
+
+_local = threading.local()
+
+
+def current_name(default):
+    """Name of the traced method running on this thread, else default"""
+    return getattr(_local, "name", None) or default
+
+
+def row_count(result):
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 0 if result is None else 1
+
+
+def query_plan(conn, query, params=()):
+    """EXPLAIN QUERY PLAN of a statement as a list of detail lines"""
+    try:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+    except sqlite3.Error as e:
+        return [f"(plan unavailable: {e})"]
+
+
+def traced(method):
+    """Time a DatabaseHandler method into its handler's query stats
+
+    Nested traced calls count only towards the outermost one, and
+    statements run inside it are attributed to its name.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(_local, "name", None) is not None:
+            return method(self, *args, **kwargs)
+        _local.name = name
+        started = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            _local.name = None
+        self.stats.record(name, (time.perf_counter() - started) * 1000, row_count(result))
+        return result
+
+    return wrapper
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def stats_for(pool):
+    """Return the query stats shared by every handler of a pool"""
+    with _stats_lock:
+        stats = _stats.get(pool)
+        if stats is None:
+            stats = QueryStats()
+            _stats[pool] = stats
+        return stats
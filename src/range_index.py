@@ -0,0 +1,153 @@
+# range_index.py
+import threading
+from bisect import bisect_left, bisect_right
+
+
+class RangeIndex:
+    """In-memory sorted arrays of control number ranges for search-as-you-type
+
+    Entries are (No_Kendali_Min, No_Kendali_Max, ID_Buku, ID_Kategori,
+    Nama_Kategori, Tahun_Cetak) tuples kept sorted twice, by lower and by
+    upper bound, so every lookup is a handful of bisections. An index is
+    never changed after it is built: shared_range_index() swaps in a new
+    one when the database has changed, also by another process, and
+    reload_range_index() does so unconditionally. Lookups need no lock.
+    """
+
+    def __init__(self, entries=()):
+        self._by_min = sorted(entries)
+        self._mins = [entry[0] for entry in self._by_min]
+        self._by_max = sorted(self._by_min, key=self._max_key)
+        self._maxes = [entry[1] for entry in self._by_max]
+        # Stabbing lookups go through one level per power-of-two width, so a
+        # few wide ranges do not make every lookup scan back across them
+        levels = {}
+        for entry in self._by_min:
+            levels.setdefault((entry[1] - entry[0]).bit_length(), []).append(entry)
+        self._levels = [
+            (1 << width_bits, [entry[0] for entry in entries], entries)
+            for width_bits, entries in sorted(levels.items())
+        ]
+
+    @staticmethod
+    def _max_key(entry):
+        return entry[1], entry[0], entry[2]
+
+    @classmethod
+    def load(cls, db):
+        """Build the index from every book with a complete range"""
+        rows = db.fetch_rows("""
+        SELECT B.No_Kendali_Min, B.No_Kendali_Max, B.ID_Buku,
+               B.ID_Kategori, K.Nama_Kategori, B.Tahun_Cetak
+        FROM BUKU B
+        LEFT JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+        WHERE B.No_Kendali_Min IS NOT NULL AND B.No_Kendali_Max IS NOT NULL
+        """)
+        return cls(rows or ())
+
+    def __len__(self):
+        return len(self._by_min)
+
+    def containing(self, nomor, limit=50):
+        """Entries whose range holds nomor, in order of lower bound"""
+        hits = []
+        for width_bound, mins, entries in self._levels:
+            # Ranges of this level are narrower than width_bound, so a hit
+            # starts no more than that before nomor
+            start = bisect_left(mins, nomor - width_bound)
+            end = bisect_right(mins, nomor)
+            hits.extend(entry for entry in entries[start:end] if entry[1] >= nomor)
+        hits.sort()
+        return hits[:limit]
+
+    def with_prefix(self, prefix, limit=50, kategori=None, tahun=None):
+        """Candidates for a typed digit prefix
+
+        First the ranges that hold the number typed so far, then ranges
+        whose lower or upper bound starts with the prefix, by lower bound.
+        kategori and tahun optionally restrict the candidates.
+        """
+        if not prefix.isdigit():
+            return []
+        number = int(prefix)
+
+        def wanted(entry):
+            return ((kategori is None or entry[3] == kategori)
+                    and (tahun is None or entry[5] == tahun))
+
+        seen = set()
+        result = []
+
+        def add(entries):
+            for entry in entries:
+                if len(result) >= limit:
+                    return
+                if entry[2] not in seen and wanted(entry):
+                    seen.add(entry[2])
+                    result.append(entry)
+
+        add(self.containing(number, limit=len(self._by_min)))
+        if not self._maxes:
+            return result
+        # Numbers starting with the prefix: [p * 10^k, (p + 1) * 10^k - 1],
+        # taking at most a few times the limit from each so short prefixes
+        # stay cheap
+        widest = len(str(self._maxes[-1]))
+        window = 4 * limit
+        matches = []
+        for extra in range(max(widest - len(prefix), 0) + 1):
+            low = number * 10 ** extra
+            high = (number + 1) * 10 ** extra - 1
+            for entries, bounds in ((self._by_min, self._mins), (self._by_max, self._maxes)):
+                first = bisect_left(bounds, low)
+                last = min(bisect_right(bounds, high), first + window)
+                matches.extend(entries[first:last])
+            if len(matches) >= window:
+                break
+        add(sorted(matches))
+        return result
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def data_version(db):
+    """Token that changes whenever BUKU may have changed: writes through
+    this process's pool and commits by any other connection or process"""
+    return db.pool.total_changes(), db.pool.data_version()
+
+
+def shared_range_index(db):
+    """Return the process-wide index, building it on first use and
+    rebuilding it once the database has changed since it was built"""
+    global _index, _index_version
+    with _index_lock:
+        # Read the version first: a write during the load makes the new
+        # index stale rather than being missed
+        version = data_version(db)
+        if _index is None or _index_version != version:
+            _index = RangeIndex.load(db)
+            _index_version = version
+        return _index
+
+
+def reload_range_index(db):
+    """Rebuild the process-wide index, e.g. after an import or restore"""
+    global _index, _index_version
+    with _index_lock:
+        version = data_version(db)
+        _index = RangeIndex.load(db)
+        _index_version = version
+        return _index
+
+
+def loaded_range_index():
+    """Return the process-wide index if it has been built, else None"""
+    return _index
+
+
+def range_index_stale(db):
+    """Whether the index is missing or older than the database"""
+    return _index is None or _index_version != data_version(db)
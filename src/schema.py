@@ -0,0 +1,615 @@
+# schema.py
+import re
+import sqlite3
+
+
+# Base tables, as in the original arsip.sqlite
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS RAK (
+        ID_Rak TEXT PRIMARY KEY,
+        Nama_Rak TEXT,
+        Urutan_Kecil_Besar TEXT)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS KATEGORI (
+        ID_Kategori INTEGER PRIMARY KEY,
+        Nama_Kategori TEXT)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS PENGGUNA (
+        ID_Pengguna INTEGER PRIMARY KEY,
+        Username TEXT UNIQUE NOT NULL,
+        Password TEXT,  -- NULL allowed
+        Role TEXT NOT NULL)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS BUKU (
+        ID_Buku TEXT PRIMARY KEY,
+        ID_Rak TEXT NOT NULL,
+        ID_Kategori INTEGER NOT NULL,
+        Tahun_Cetak INTEGER,
+        No_Kendali_Min INTEGER,
+        No_Kendali_Max INTEGER,
+        Warna_Sampul TEXT,
+        Subkategori TEXT,
+        Status_Kondisi TEXT CHECK(Status_Kondisi IN ('Baik', 'Rusak', 'Hilang')),
+        Status_Lokasi TEXT CHECK(Status_Lokasi IN ('Di Rak', 'Di Lantai', 'Dipinjam')),
+        FOREIGN KEY(ID_Rak) REFERENCES RAK(ID_Rak),
+        FOREIGN KEY(ID_Kategori) REFERENCES KATEGORI(ID_Kategori))
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS LOG_AKTIVITAS (
+        ID_Log INTEGER PRIMARY KEY AUTOINCREMENT,
+        ID_Pengguna INTEGER NOT NULL,
+        ID_Buku TEXT NOT NULL,
+        Waktu DATETIME DEFAULT CURRENT_TIMESTAMP,
+        Jenis_Aksi TEXT CHECK(Jenis_Aksi IN ('Tambah', 'Edit', 'Hapus', 'Pinjam', 'Kembalikan')),
+        Detail_Perubahan TEXT,
+        Status_Sebelum TEXT,
+        Status_Sesudah TEXT,
+        Status_Aksi TEXT,
+        FOREIGN KEY(ID_Pengguna) REFERENCES PENGGUNA(ID_Pengguna),
+        FOREIGN KEY(ID_Buku) REFERENCES BUKU(ID_Buku))
+    """,
+]
+
+# The location tables filter BUKU by status; rak renames look books up by
+# rak. The category and year filters are served by SEARCH_INDEX below.
+BOOK_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_buku_status ON BUKU (Status_Lokasi)",
+    "CREATE INDEX IF NOT EXISTS idx_buku_rak ON BUKU (ID_Rak)",
+]
+
+# Books of one rak and status in ID order, read from the index alone;
+# replaces idx_buku_rak, whose lookups it also serves.
+RAK_STATUS_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_buku_rak_status ON BUKU (ID_Rak, Status_Lokasi, ID_Buku)
+"""
+
+# R*Tree over the control number range of every book. The auxiliary
+# ID_Buku column lets lookups join BUKU through its primary key.
+RANGE_INDEX_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS BUKU_RENTANG USING rtree_i32(
+    id,
+    No_Kendali_Min, No_Kendali_Max,
+    +ID_Buku
+)
+"""
+
+# A stable integer per ID_Buku, used as the id of BUKU_RENTANG and the
+# rowid of BUKU_FTS. BUKU's own rowid cannot serve: BUKU has a TEXT
+# primary key, so VACUUM may renumber it. Triggers only ever add keys,
+# so they work in any firing order; keys of deleted books are pruned by
+# sync_book_keys().
+BOOK_KEY_TABLE = """
+CREATE TABLE IF NOT EXISTS BUKU_KUNCI (
+    id INTEGER PRIMARY KEY,
+    ID_Buku TEXT NOT NULL UNIQUE
+)
+"""
+_BOOK_KEY_ADD = """
+        INSERT OR IGNORE INTO BUKU_KUNCI (ID_Buku) VALUES (NEW.ID_Buku);"""
+_BOOK_KEY_NEW = "(SELECT id FROM BUKU_KUNCI WHERE ID_Buku = NEW.ID_Buku)"
+_BOOK_KEY_OLD = "(SELECT id FROM BUKU_KUNCI WHERE ID_Buku = OLD.ID_Buku)"
+
+# rtree_i32 stores signed 32-bit coordinates; control numbers outside
+# them would wrap around silently, so they are refused
+RANGE_CHECK = (
+    "{row}No_Kendali_Min NOT BETWEEN -2147483648 AND 2147483647"
+    " OR {row}No_Kendali_Max NOT BETWEEN -2147483648 AND 2147483647"
+)
+RANGE_OUT_OF_BOUNDS = RANGE_CHECK.format(row="NEW.")
+
+RANGE_INDEX_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_rentang_batas_insert
+    BEFORE INSERT ON BUKU
+    WHEN {RANGE_OUT_OF_BOUNDS}
+    BEGIN
+        SELECT RAISE(ABORT, 'No_Kendali di luar rentang 32-bit');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_rentang_batas_update
+    BEFORE UPDATE OF No_Kendali_Min, No_Kendali_Max ON BUKU
+    WHEN {RANGE_OUT_OF_BOUNDS}
+    BEGIN
+        SELECT RAISE(ABORT, 'No_Kendali di luar rentang 32-bit');
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_rentang_insert
+    AFTER INSERT ON BUKU
+    BEGIN{_BOOK_KEY_ADD}
+        INSERT INTO BUKU_RENTANG (id, No_Kendali_Min, No_Kendali_Max, ID_Buku)
+        SELECT {_BOOK_KEY_NEW}, NEW.No_Kendali_Min, NEW.No_Kendali_Max, NEW.ID_Buku
+        WHERE NEW.No_Kendali_Min IS NOT NULL AND NEW.No_Kendali_Max IS NOT NULL;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_rentang_delete
+    AFTER DELETE ON BUKU
+    BEGIN
+        DELETE FROM BUKU_RENTANG WHERE id = {_BOOK_KEY_OLD};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_rentang_update
+    AFTER UPDATE OF ID_Buku, No_Kendali_Min, No_Kendali_Max ON BUKU
+    BEGIN
+        DELETE FROM BUKU_RENTANG WHERE id = {_BOOK_KEY_OLD};{_BOOK_KEY_ADD}
+        INSERT INTO BUKU_RENTANG (id, No_Kendali_Min, No_Kendali_Max, ID_Buku)
+        SELECT {_BOOK_KEY_NEW}, NEW.No_Kendali_Min, NEW.No_Kendali_Max, NEW.ID_Buku
+        WHERE NEW.No_Kendali_Min IS NOT NULL AND NEW.No_Kendali_Max IS NOT NULL;
+    END
+    """,
+]
+
+# Filtered search: category and year pin the prefix, the range bounds
+# are checked from the index without touching BUKU rows.
+SEARCH_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_buku_kategori_tahun_rentang
+ON BUKU (ID_Kategori, Tahun_Cetak, No_Kendali_Min, No_Kendali_Max)
+"""
+
+# The log viewer pages newest-first on (Waktu, ID_Log); every filter
+# column leads its own index so a filtered page is still a range scan.
+LOG_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_log_waktu ON LOG_AKTIVITAS (Waktu, ID_Log)",
+    "CREATE INDEX IF NOT EXISTS idx_log_buku ON LOG_AKTIVITAS (ID_Buku, Waktu, ID_Log)",
+    "CREATE INDEX IF NOT EXISTS idx_log_pengguna ON LOG_AKTIVITAS (ID_Pengguna, Waktu, ID_Log)",
+    "CREATE INDEX IF NOT EXISTS idx_log_aksi ON LOG_AKTIVITAS (Jenis_Aksi, Waktu, ID_Log)",
+]
+
+# Per-day, per-action counts of LOG_AKTIVITAS. Rows are only ever added,
+# so the counts survive archival of the log rows themselves.
+LOG_SUMMARY_TABLE = """
+CREATE TABLE IF NOT EXISTS LOG_RINGKASAN (
+    Tanggal TEXT NOT NULL,
+    Jenis_Aksi TEXT NOT NULL,
+    Jumlah INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (Tanggal, Jenis_Aksi)
+) WITHOUT ROWID
+"""
+
+LOG_SUMMARY_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS trg_log_ringkasan_insert
+AFTER INSERT ON LOG_AKTIVITAS
+BEGIN
+    INSERT INTO LOG_RINGKASAN (Tanggal, Jenis_Aksi, Jumlah)
+    VALUES (coalesce(date(NEW.Waktu), ''), coalesce(NEW.Jenis_Aksi, ''), 1)
+    ON CONFLICT (Tanggal, Jenis_Aksi) DO UPDATE SET Jumlah = Jumlah + 1;
+END
+"""
+
+# Book counts per category, year and location status, and per rak and
+# status, kept current by triggers on BUKU so the dashboard never has to
+# scan BUKU. A missing year or status is counted under 0 or ''.
+STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS STATISTIK_KATEGORI (
+        ID_Kategori INTEGER NOT NULL,
+        Tahun_Cetak INTEGER NOT NULL,
+        Status_Lokasi TEXT NOT NULL,
+        Jumlah INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (ID_Kategori, Tahun_Cetak, Status_Lokasi)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS STATISTIK_RAK (
+        ID_Rak TEXT NOT NULL,
+        Status_Lokasi TEXT NOT NULL,
+        Jumlah INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (ID_Rak, Status_Lokasi)
+    ) WITHOUT ROWID
+    """,
+]
+
+_STATS_ADD = """
+    INSERT INTO STATISTIK_KATEGORI (ID_Kategori, Tahun_Cetak, Status_Lokasi, Jumlah)
+    VALUES (NEW.ID_Kategori, coalesce(NEW.Tahun_Cetak, 0), coalesce(NEW.Status_Lokasi, ''), 1)
+    ON CONFLICT (ID_Kategori, Tahun_Cetak, Status_Lokasi) DO UPDATE SET Jumlah = Jumlah + 1;
+    INSERT INTO STATISTIK_RAK (ID_Rak, Status_Lokasi, Jumlah)
+    VALUES (NEW.ID_Rak, coalesce(NEW.Status_Lokasi, ''), 1)
+    ON CONFLICT (ID_Rak, Status_Lokasi) DO UPDATE SET Jumlah = Jumlah + 1;
+"""
+
+_STATS_REMOVE = """
+    UPDATE STATISTIK_KATEGORI SET Jumlah = Jumlah - 1
+    WHERE ID_Kategori = OLD.ID_Kategori AND Tahun_Cetak = coalesce(OLD.Tahun_Cetak, 0)
+      AND Status_Lokasi = coalesce(OLD.Status_Lokasi, '');
+    UPDATE STATISTIK_RAK SET Jumlah = Jumlah - 1
+    WHERE ID_Rak = OLD.ID_Rak AND Status_Lokasi = coalesce(OLD.Status_Lokasi, '');
+"""
+
+STATS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_statistik_insert
+    AFTER INSERT ON BUKU
+    BEGIN{_STATS_ADD}END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_statistik_delete
+    AFTER DELETE ON BUKU
+    BEGIN{_STATS_REMOVE}END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_statistik_update
+    AFTER UPDATE OF ID_Rak, ID_Kategori, Tahun_Cetak, Status_Lokasi ON BUKU
+    BEGIN{_STATS_REMOVE}{_STATS_ADD}END
+    """,
+]
+
+# Full-text search. BUKU_FTS holds one row per book under its BUKU_KUNCI id,
+# with the rak and category names copied in; LOG_FTS is an external
+# content index over LOG_AKTIVITAS.Detail_Perubahan.
+FTS_TABLES = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS BUKU_FTS USING fts5(
+        ID_Buku UNINDEXED, Subkategori, Warna_Sampul, Nama_Rak, Nama_Kategori, Tahun_Cetak,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS LOG_FTS USING fts5(
+        Detail_Perubahan,
+        content = 'LOG_AKTIVITAS', content_rowid = 'ID_Log',
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+]
+
+_FTS_BUKU_ADD = f"""{_BOOK_KEY_ADD}
+    INSERT INTO BUKU_FTS (rowid, ID_Buku, Subkategori, Warna_Sampul, Nama_Rak, Nama_Kategori, Tahun_Cetak)
+    VALUES ({_BOOK_KEY_NEW}, NEW.ID_Buku, NEW.Subkategori, NEW.Warna_Sampul,
+            (SELECT Nama_Rak FROM RAK WHERE ID_Rak = NEW.ID_Rak),
+            (SELECT Nama_Kategori FROM KATEGORI WHERE ID_Kategori = NEW.ID_Kategori),
+            NEW.Tahun_Cetak);
+"""
+
+BOOK_FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_fts_insert
+    AFTER INSERT ON BUKU
+    BEGIN{_FTS_BUKU_ADD}END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_fts_delete
+    AFTER DELETE ON BUKU
+    BEGIN
+        DELETE FROM BUKU_FTS WHERE rowid = {_BOOK_KEY_OLD};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_buku_fts_update
+    AFTER UPDATE OF ID_Buku, ID_Rak, ID_Kategori, Tahun_Cetak, Warna_Sampul, Subkategori ON BUKU
+    BEGIN
+        DELETE FROM BUKU_FTS WHERE rowid = {_BOOK_KEY_OLD};{_FTS_BUKU_ADD}END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rak_fts_update
+    AFTER UPDATE OF Nama_Rak ON RAK
+    BEGIN
+        UPDATE BUKU_FTS SET Nama_Rak = NEW.Nama_Rak
+        WHERE rowid IN (SELECT K.id FROM BUKU B JOIN BUKU_KUNCI K ON K.ID_Buku = B.ID_Buku
+                        WHERE B.ID_Rak = NEW.ID_Rak);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_kategori_fts_update
+    AFTER UPDATE OF Nama_Kategori ON KATEGORI
+    BEGIN
+        UPDATE BUKU_FTS SET Nama_Kategori = NEW.Nama_Kategori
+        WHERE rowid IN (SELECT K.id FROM BUKU B JOIN BUKU_KUNCI K ON K.ID_Buku = B.ID_Buku
+                        WHERE B.ID_Kategori = NEW.ID_Kategori);
+    END
+    """,
+]
+
+FTS_TRIGGERS = BOOK_FTS_TRIGGERS + [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_log_fts_insert
+    AFTER INSERT ON LOG_AKTIVITAS
+    BEGIN
+        INSERT INTO LOG_FTS (rowid, Detail_Perubahan) VALUES (NEW.ID_Log, NEW.Detail_Perubahan);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_log_fts_delete
+    AFTER DELETE ON LOG_AKTIVITAS
+    BEGIN
+        INSERT INTO LOG_FTS (LOG_FTS, rowid, Detail_Perubahan)
+        VALUES ('delete', OLD.ID_Log, OLD.Detail_Perubahan);
+    END
+    """,
+]
+
+
+def table_exists(conn, name):
+    """Check whether a table (or virtual table) exists"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def sync_book_keys(conn):
+    """Give every book a BUKU_KUNCI key and drop the keys of deleted books;
+    existing keys are kept, so the indexes that use them stay valid"""
+    conn.execute("DELETE FROM BUKU_KUNCI WHERE ID_Buku NOT IN (SELECT ID_Buku FROM BUKU)")
+    conn.execute("""
+    INSERT OR IGNORE INTO BUKU_KUNCI (ID_Buku)
+    SELECT ID_Buku FROM BUKU ORDER BY No_Kendali_Min
+    """)
+
+
+def rebuild_range_index(conn):
+    """Refill BUKU_RENTANG from BUKU"""
+    sync_book_keys(conn)
+    conn.execute("DELETE FROM BUKU_RENTANG")
+    conn.execute("""
+    INSERT INTO BUKU_RENTANG (id, No_Kendali_Min, No_Kendali_Max, ID_Buku)
+    SELECT K.id, B.No_Kendali_Min, B.No_Kendali_Max, B.ID_Buku
+    FROM BUKU_KUNCI K
+    JOIN BUKU B ON B.ID_Buku = K.ID_Buku
+    WHERE B.No_Kendali_Min IS NOT NULL AND B.No_Kendali_Max IS NOT NULL
+    ORDER BY K.id
+    """)
+
+
+def ensure_range_index(conn):
+    """Create the control number range index and its triggers if missing"""
+    created = not table_exists(conn, "BUKU_RENTANG")
+    conn.execute("BEGIN")
+    try:
+        conn.execute(RANGE_INDEX_TABLE)
+        conn.execute(BOOK_KEY_TABLE)
+        for trigger in RANGE_INDEX_TRIGGERS:
+            conn.execute(trigger)
+        if created:
+            rebuild_range_index(conn)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return created
+
+
+def replace_triggers(conn, triggers):
+    """Drop and recreate triggers whose definition changed; CREATE TRIGGER
+    IF NOT EXISTS would keep the old ones"""
+    for trigger in triggers:
+        name = re.search(r"IF NOT EXISTS (\w+)", trigger).group(1)
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(trigger)
+
+
+def ensure_range_keys(conn):
+    """Key BUKU_RENTANG on BUKU_KUNCI and refuse control numbers that do
+    not fit its 32-bit coordinates
+
+    Fails while any book already holds such a range: its index entry
+    has wrapped around and the book must be corrected first.
+    """
+    conn.execute("BEGIN")
+    try:
+        bad = conn.execute(f"""
+        SELECT ID_Buku FROM BUKU
+        WHERE {RANGE_CHECK.format(row="")}
+        LIMIT 10
+        """).fetchall()
+        if bad:
+            raise sqlite3.IntegrityError(
+                "No_Kendali di luar rentang 32-bit: " + ", ".join(str(row[0]) for row in bad)
+            )
+        conn.execute(BOOK_KEY_TABLE)
+        replace_triggers(conn, RANGE_INDEX_TRIGGERS)
+        rebuild_range_index(conn)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def ensure_search_index(conn):
+    """Create the composite category/year/range index if missing"""
+    conn.execute(SEARCH_INDEX)
+
+
+def ensure_log_indexes(conn):
+    """Create the indexes behind the activity log viewer if missing"""
+    for index in LOG_INDEXES:
+        conn.execute(index)
+
+
+def ensure_log_summary(conn):
+    """Create LOG_RINGKASAN and its trigger, counting the live log once"""
+    created = not table_exists(conn, "LOG_RINGKASAN")
+    conn.execute("BEGIN")
+    try:
+        conn.execute(LOG_SUMMARY_TABLE)
+        conn.execute(LOG_SUMMARY_TRIGGER)
+        if created:
+            conn.execute("""
+            INSERT INTO LOG_RINGKASAN (Tanggal, Jenis_Aksi, Jumlah)
+            SELECT coalesce(date(Waktu), ''), coalesce(Jenis_Aksi, ''), count(*)
+            FROM LOG_AKTIVITAS
+            GROUP BY 1, 2
+            """)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return created
+
+
+def rebuild_stats(conn):
+    """Recount STATISTIK_KATEGORI and STATISTIK_RAK from BUKU"""
+    conn.execute("DELETE FROM STATISTIK_KATEGORI")
+    conn.execute("DELETE FROM STATISTIK_RAK")
+    conn.execute("""
+    INSERT INTO STATISTIK_KATEGORI (ID_Kategori, Tahun_Cetak, Status_Lokasi, Jumlah)
+    SELECT ID_Kategori, coalesce(Tahun_Cetak, 0), coalesce(Status_Lokasi, ''), count(*)
+    FROM BUKU
+    GROUP BY 1, 2, 3
+    """)
+    conn.execute("""
+    INSERT INTO STATISTIK_RAK (ID_Rak, Status_Lokasi, Jumlah)
+    SELECT ID_Rak, coalesce(Status_Lokasi, ''), count(*)
+    FROM BUKU
+    GROUP BY 1, 2
+    """)
+
+
+def ensure_stats(conn):
+    """Create the status counter tables and their triggers if missing"""
+    created = not table_exists(conn, "STATISTIK_KATEGORI")
+    conn.execute("BEGIN")
+    try:
+        for table in STATS_TABLES:
+            conn.execute(table)
+        for trigger in STATS_TRIGGERS:
+            conn.execute(trigger)
+        if created:
+            rebuild_stats(conn)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return created
+
+
+def rebuild_book_fts(conn):
+    """Refill BUKU_FTS from BUKU, RAK and KATEGORI"""
+    sync_book_keys(conn)
+    conn.execute("DELETE FROM BUKU_FTS")
+    conn.execute("""
+    INSERT INTO BUKU_FTS (rowid, ID_Buku, Subkategori, Warna_Sampul, Nama_Rak, Nama_Kategori, Tahun_Cetak)
+    SELECT BK.id, B.ID_Buku, B.Subkategori, B.Warna_Sampul, R.Nama_Rak, K.Nama_Kategori, B.Tahun_Cetak
+    FROM BUKU B
+    JOIN BUKU_KUNCI BK ON BK.ID_Buku = B.ID_Buku
+    LEFT JOIN RAK R ON B.ID_Rak = R.ID_Rak
+    LEFT JOIN KATEGORI K ON B.ID_Kategori = K.ID_Kategori
+    """)
+
+
+def ensure_fts(conn):
+    """Create the full-text indexes and their triggers if missing"""
+    created = not table_exists(conn, "BUKU_FTS")
+    conn.execute("BEGIN")
+    try:
+        for table in FTS_TABLES:
+            conn.execute(table)
+        for trigger in FTS_TRIGGERS:
+            conn.execute(trigger)
+        if created:
+            rebuild_book_fts(conn)
+            conn.execute("INSERT INTO LOG_FTS (LOG_FTS) VALUES ('rebuild')")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return created
+
+
+def ensure_book_keys(conn):
+    """Key BUKU_FTS on BUKU_KUNCI instead of BUKU's rowid, which VACUUM
+    may renumber, and move BUKU_RENTANG to the same keys"""
+    conn.execute("BEGIN")
+    try:
+        conn.execute(BOOK_KEY_TABLE)
+        replace_triggers(conn, RANGE_INDEX_TRIGGERS + BOOK_FTS_TRIGGERS)
+        conn.execute("DROP TABLE IF EXISTS BUKU_RENTANG_KUNCI")
+        rebuild_range_index(conn)
+        rebuild_book_fts(conn)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def create_base_tables(conn):
+    """Create the base tables of an empty database"""
+    conn.execute("BEGIN")
+    try:
+        for table in BASE_TABLES:
+            conn.execute(table)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def ensure_book_indexes(conn):
+    """Create the status and rak indexes on BUKU if missing"""
+    for index in BOOK_INDEXES:
+        conn.execute(index)
+
+
+def ensure_rak_status_index(conn):
+    """Replace idx_buku_rak by the covering rak/status index"""
+    conn.execute(RAK_STATUS_INDEX)
+    conn.execute("DROP INDEX IF EXISTS idx_buku_rak")
+
+
+# Numbered schema migrations; PRAGMA user_version holds the last one
+# applied. Every step is idempotent, so a database that already has some
+# of these objects (or a run interrupted between a step and recording its
+# number) simply goes through the step again.
+MIGRATIONS = [
+    (1, create_base_tables),
+    (2, ensure_range_index),
+    (3, ensure_search_index),
+    (4, ensure_log_indexes),
+    (5, ensure_log_summary),
+    (6, ensure_stats),
+    (7, ensure_fts),
+    (8, ensure_book_indexes),
+    (9, ensure_rak_status_index),
+    (10, ensure_range_keys),
+    (11, ensure_book_keys),
+    (12, ensure_log_indexes),  # adds idx_log_aksi
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply every migration newer than the database, then ANALYZE
+
+    Returns the schema version the database ends up at. A database from
+    a newer version of the application is left untouched.
+    """
+    version = schema_version(conn)
+    if version > SCHEMA_VERSION:
+        print(f"Schema version {version} is newer than this application ({SCHEMA_VERSION})")
+        return version
+    pending = [(number, step) for number, step in MIGRATIONS if number > version]
+    for number, step in pending:
+        step(conn)
+        conn.execute(f"PRAGMA user_version = {number}")
+    if pending:
+        # Bounded sampling keeps ANALYZE quick on large catalogs
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE")
+    return schema_version(conn)
+
+
+def rebuild_derived(conn):
+    """Recompute every table derived from BUKU, e.g. after a bulk load"""
+    rebuild_range_index(conn)
+    rebuild_stats(conn)
+    rebuild_book_fts(conn)
+
+
+def ensure_schema(conn):
+    """Bring the database up to the current schema version"""
+    try:
+        migrate(conn)
+    except sqlite3.Error as e:
+        print(f"Schema error: {e}")
@@ -0,0 +1,98 @@
+# search_suggest.py
+from PyQt6.QtCore import QObject, Qt, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QListWidget, QListWidgetItem
+
+from range_index import loaded_range_index, range_index_stale, shared_range_index
+
+
+class SearchSuggester(QObject):
+    """Search-as-you-type for Form_Nomor_Kendali
+
+    Keystrokes are debounced; each settled prefix is answered from the
+    in-memory RangeIndex and shown in a list below the input; when the
+    database has changed since the index was built, the old index answers
+    while a fresh one loads in the background. Typing also
+    cancels the window's in-flight "search" query. Choosing a candidate
+    emits book_chosen with its ID_Buku.
+    """
+
+    book_chosen = pyqtSignal(str)
+
+    DEBOUNCE_MS = 150
+    LIMIT = 30
+
+    def __init__(self, window, filters=None):
+        super().__init__(window)
+        self.window = window
+        self.editor = window.Form_Nomor_Kendali
+        self.filters = filters or (lambda: (None, None))
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self.update_candidates)
+
+        self._list = QListWidget(window.centralwidget)
+        self._list.setGeometry(self.editor.x(), self.editor.y() + self.editor.height(),
+                               max(self.editor.width(), 320), 160)
+        self._list.hide()
+        self._list.itemClicked.connect(self.choose)
+        self._list.itemActivated.connect(self.choose)
+
+        self._loading = False
+        self.editor.textChanged.connect(self.on_text_changed)
+        self.refresh_index()
+
+    def refresh_index(self):
+        """Load or reload the shared index in the background if it is stale"""
+        if self._loading or not range_index_stale(self.window.db):
+            return
+        self._loading = True
+        self.window.async_db.submit(
+            shared_range_index, self.window.db,
+            on_result=self.index_loaded, on_error=self.index_failed
+        )
+
+    def index_loaded(self, _):
+        self._loading = False
+        self.show_candidates()
+
+    def index_failed(self, _):
+        self._loading = False
+
+    def on_text_changed(self):
+        self.window.async_db.cancel("search")
+        self._timer.start()
+
+    def update_candidates(self):
+        self.refresh_index()
+        self.show_candidates()
+
+    def show_candidates(self):
+        index = loaded_range_index()
+        prefix = self.editor.toPlainText().strip()
+        if index is None or not prefix.isdigit():
+            self._list.hide()
+            return
+        kategori, tahun = self.filters()
+        candidates = index.with_prefix(prefix, self.LIMIT, kategori=kategori, tahun=tahun)
+        self._list.clear()
+        for nomor_min, nomor_max, book_id, _, nama_kategori, tahun_cetak in candidates:
+            item = QListWidgetItem(
+                f"{nomor_min}-{nomor_max}  {nama_kategori or ''} {tahun_cetak or ''}  ({book_id})"
+            )
+            item.setData(Qt.ItemDataRole.UserRole, book_id)
+            self._list.addItem(item)
+        if candidates:
+            self._list.show()
+            self._list.raise_()
+        else:
+            self._list.hide()
+
+    def choose(self, item):
+        self._list.hide()
+        self.book_chosen.emit(item.data(Qt.ItemDataRole.UserRole))
+
+    def hide(self):
+        self._timer.stop()
+        self._list.hide()
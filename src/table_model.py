@@ -0,0 +1,199 @@
+# table_model.py
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from database import BOOK_COLUMNS, LOG_COLUMNS, LOG_PAGE_SIZE
+
+
+BOOK_HEADERS = [
+    "ID Buku", "Rak", "Kategori", "Tahun Cetak",
+    "Min No", "Max No", "Warna Sampul", "Subkategori",
+    "Status Kondisi", "Status Lokasi"
+]
+
+
+class BookTableModel(QAbstractTableModel):
+    """Read-only book table over a list of row tuples in BOOK_COLUMNS order
+
+    Rows are exposed to the view in batches through canFetchMore/fetchMore,
+    and cell text is only produced when the view asks for it in data().
+    Row positions are kept per ID_Buku; a removal shifts the rows after
+    it, so their positions are refreshed lazily on the next lookup.
+    """
+
+    FETCH_BATCH = 200
+
+    def __init__(self, rows=(), parent=None):
+        super().__init__(parent)
+        self._rows = list(rows)
+        self._positions = {row[0]: position for position, row in enumerate(self._rows)}
+        self._valid_upto = len(self._rows)  # positions below this are current
+        self._loaded = min(len(self._rows), self.FETCH_BATCH)
+
+    @classmethod
+    def from_books(cls, books, parent=None):
+        """Build a model from book dictionaries"""
+        rows = [tuple(book.get(column) for column in BOOK_COLUMNS) for book in books]
+        return cls(rows, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(BOOK_COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self._rows[index.row()][index.column()]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return BOOK_HEADERS[section]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, len(self._rows) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def _position(self, book_id):
+        position = self._positions.get(book_id)
+        if position is not None and position >= self._valid_upto:
+            for index in range(self._valid_upto, len(self._rows)):
+                self._positions[self._rows[index][0]] = index
+            self._valid_upto = len(self._rows)
+            position = self._positions[book_id]
+        return position
+
+    def insert_book(self, row):
+        """Append one row tuple without rebuilding the model"""
+        if row[0] in self._positions:
+            return
+        position = len(self._rows)
+        if self._loaded < position:
+            # Not fetched by the view yet; fetchMore will pick it up
+            self._rows.append(row)
+            self._positions[row[0]] = position
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.append(row)
+        self._positions[row[0]] = position
+        self._loaded += 1
+        self.endInsertRows()
+
+    def remove_book(self, book_id):
+        """Remove the row of one book, returning False if it is not in the model"""
+        position = self._position(book_id)
+        if position is None:
+            return False
+        del self._positions[book_id]
+        self._valid_upto = min(self._valid_upto, position)
+        if position >= self._loaded:
+            del self._rows[position]
+            return True
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._rows[position]
+        self._loaded -= 1
+        self.endRemoveRows()
+        return True
+
+    def total_rows(self):
+        return len(self._rows)
+
+    def row_values(self, row):
+        return self._rows[row]
+
+
+LOG_HEADERS = [
+    "ID Log", "Waktu", "Pengguna", "ID Buku", "Aksi",
+    "Detail", "Status Sebelum", "Status Sesudah"
+]
+
+
+class LogTableModel(QAbstractTableModel):
+    """Read-only activity log that loads its pages from the database on scroll
+
+    load_page(after, on_result) is called with the (Waktu, ID_Log) key of
+    the last loaded row and must eventually call on_result with the next
+    page of row tuples in LOG_COLUMNS order; it may do so asynchronously.
+    """
+
+    def __init__(self, load_page, parent=None):
+        super().__init__(parent)
+        self._load_page = load_page
+        self._rows = []
+        self._pending = False
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(LOG_COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self._rows[index.row()][index.column()]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return LOG_HEADERS[section]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._pending
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._pending = True
+        after = (self._rows[-1][1], self._rows[-1][0]) if self._rows else None
+        self._load_page(after, self.append_page)
+
+    def append_page(self, rows):
+        """Add the rows of a loaded page; a short page marks the end of the log"""
+        self._pending = False
+        rows = rows or []
+        if len(rows) < LOG_PAGE_SIZE:
+            self._exhausted = True
+        if not rows:
+            return
+        position = len(self._rows)
+        self.beginInsertRows(QModelIndex(), position, position + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def is_exhausted(self):
+        return self._exhausted
+
+
+def size_columns(table, sample_size=50, padding=16):
+    """Size columns from the header and a sample of rows instead of every row"""
+    model = table.model()
+    if model is None:
+        return
+    metrics = table.fontMetrics()
+    header = table.horizontalHeader()
+    rows = min(model.rowCount(), sample_size)
+    for column in range(model.columnCount()):
+        title = model.headerData(column, Qt.Orientation.Horizontal) or ""
+        width = metrics.horizontalAdvance(title)
+        for row in range(rows):
+            text = model.index(row, column).data() or ""
+            width = max(width, metrics.horizontalAdvance(text))
+        header.resizeSection(column, width + padding)
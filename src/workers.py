@@ -0,0 +1,241 @@
+# workers.py
+import itertools
+import weakref
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import QMessageBox, QProgressBar, QProgressDialog
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class QueryWorker(QRunnable):
+    """Run a single database call on a pool thread"""
+
+    def __init__(self, request_id, fn, args, kwargs):
+        super().__init__()
+        self.request_id = request_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        # AsyncDatabase keeps the reference until the result is delivered
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        self.signals.finished.emit(self.request_id, result)
+
+
+class TaskSignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class TaskWorker(QRunnable):
+    """Run a long task that reports through a progress(done, total) callback"""
+
+    def __init__(self, fn, args, kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, progress=self.signals.progress.emit, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+
+
+def run_with_progress(window, label, fn, *args, on_result=None, **kwargs):
+    """Run fn on the thread pool behind a modal progress dialog"""
+    dialog = QProgressDialog(label, None, 0, 0, window)
+    dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    dialog.setMinimumDuration(0)
+    dialog.setAutoClose(False)
+    worker = TaskWorker(fn, args, kwargs)
+    # Keep the worker alive until it reports back
+    window._running_tasks = getattr(window, "_running_tasks", set())
+    window._running_tasks.add(worker)
+
+    def on_progress(done, total):
+        dialog.setMaximum(total)
+        dialog.setValue(done)
+
+    def finish():
+        window._running_tasks.discard(worker)
+        dialog.close()
+
+    def on_finished(result):
+        finish()
+        if on_result is not None:
+            on_result(result)
+
+    def on_failed(message):
+        finish()
+        QMessageBox.critical(window, "Gagal", message)
+
+    worker.signals.progress.connect(on_progress)
+    worker.signals.finished.connect(on_finished)
+    worker.signals.failed.connect(on_failed)
+    dialog.show()
+    QThreadPool.globalInstance().start(worker)
+    return worker
+
+
+class AsyncDatabase(QObject):
+    """Runs DatabaseHandler calls off the GUI thread and delivers results via signals
+
+    Reads run on the global thread pool. Writes run on a private
+    single-thread pool so status changes are applied in the order they
+    were requested. A request submitted on a channel supersedes any
+    earlier request on the same channel: a queued one is withdrawn and a
+    running one has its result dropped.
+    """
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.read_pool = QThreadPool.globalInstance()
+        self.write_pool = QThreadPool(self)
+        self.write_pool.setMaxThreadCount(1)
+        _write_pools.add(self.write_pool)
+        self._ids = itertools.count(1)
+        self._workers = {}
+        self._requests = {}
+        self._channels = {}
+
+    def submit(self, fn, *args, on_result=None, on_error=None, channel=None,
+               write=False, **kwargs):
+        """Queue fn(*args, **kwargs) and call on_result with its return value"""
+        if channel is not None:
+            self.cancel(channel)
+        request_id = next(self._ids)
+        worker = QueryWorker(request_id, fn, args, kwargs)
+        worker.signals.finished.connect(self._on_finished)
+        worker.signals.failed.connect(self._on_failed)
+        pool = self.write_pool if write else self.read_pool
+        was_busy = bool(self._requests)
+        self._workers[request_id] = worker
+        self._requests[request_id] = (pool, on_result, on_error)
+        if channel is not None:
+            self._channels[channel] = request_id
+        pool.start(worker)
+        if not was_busy:
+            self.busy_changed.emit(True)
+        return request_id
+
+    def cancel(self, channel):
+        """Withdraw the pending request on a channel, if any"""
+        request_id = self._channels.pop(channel, None)
+        if request_id is None or request_id not in self._requests:
+            return
+        pool = self._requests[request_id][0]
+        if pool.tryTake(self._workers[request_id]):
+            # Never started, so no signal will arrive for it
+            del self._workers[request_id]
+        self._forget(request_id)
+
+    def is_busy(self):
+        return bool(self._requests)
+
+    def is_pending(self, channel):
+        return channel in self._channels
+
+    def _forget(self, request_id):
+        self._requests.pop(request_id, None)
+        for channel, current in list(self._channels.items()):
+            if current == request_id:
+                del self._channels[channel]
+        if not self._requests:
+            self.busy_changed.emit(False)
+
+    @pyqtSlot(int, object)
+    def _on_finished(self, request_id, result):
+        self._workers.pop(request_id, None)
+        entry = self._requests.get(request_id)
+        if entry is None:
+            return  # cancelled or superseded
+        self._forget(request_id)
+        on_result = entry[1]
+        if on_result is not None:
+            on_result(result)
+
+    @pyqtSlot(int, str)
+    def _on_failed(self, request_id, message):
+        self._workers.pop(request_id, None)
+        entry = self._requests.get(request_id)
+        if entry is None:
+            return
+        self._forget(request_id)
+        on_error = entry[2]
+        if on_error is not None:
+            on_error(message)
+        else:
+            print(f"Background query error: {message}")
+
+
+_write_pools = weakref.WeakSet()
+
+
+def wait_for_workers():
+    """Block until every queued and running database call has finished,
+    e.g. on QApplication.aboutToQuit before the log writers stop"""
+    for pool in list(_write_pools):
+        try:
+            pool.waitForDone()
+        except RuntimeError:
+            pass  # deleted together with its window
+    QThreadPool.globalInstance().waitForDone()
+
+
+class StatusEvents(QObject):
+    """Process-wide notification that a book changed location status"""
+
+    # book id, old status, new status, updated row tuple in BOOK_COLUMNS order
+    status_changed = pyqtSignal(str, str, str, object)
+
+
+_status_events = None
+
+
+def status_events():
+    """Return the shared StatusEvents instance"""
+    global _status_events
+    if _status_events is None:
+        _status_events = StatusEvents()
+    return _status_events
+
+
+def install_busy_indicator(window, async_db):
+    """Show an indeterminate progress bar in the status bar while queries run"""
+    indicator = QProgressBar(window)
+    indicator.setRange(0, 0)
+    indicator.setMaximumWidth(120)
+    indicator.setMaximumHeight(14)
+    indicator.setTextVisible(False)
+    indicator.setVisible(False)
+    window.statusbar.addPermanentWidget(indicator)
+
+    def update(busy):
+        indicator.setVisible(busy)
+        if busy:
+            window.statusbar.showMessage("Memuat data...")
+        else:
+            window.statusbar.clearMessage()
+
+    async_db.busy_changed.connect(update)
+    return indicator